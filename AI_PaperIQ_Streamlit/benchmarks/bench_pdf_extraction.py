@@ -0,0 +1,96 @@
+"""
+Scaling of parallel PDF text extraction against the serial page loop.
+
+Times pdf_extractor.iter_pdf_pages (one core, in-process) against the
+process pool with an increasing number of workers, and checks that every run
+returns the same text. The pool is started before timing, so spawn cost is
+reported separately, as is the fixed per-run overhead (task dispatch and each
+worker opening the file); from those the break-even document size per worker
+count is printed, which is what PDF_PARALLEL_MIN_PAGES should be set from.
+Speed-ups need as many free CPUs as workers. Without a PDF argument a
+synthetic document of --pages pages is generated.
+
+Usage (from the AI_PaperIQ_Streamlit folder):
+    python benchmarks/bench_pdf_extraction.py [thesis.pdf] [--pages 400] [--workers 1 2 4 8] [--repeat 3]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # noqa: E402
+
+from utils import pdf_extractor  # noqa: E402
+
+PARAGRAPH = ('Transformers use self-attention to model long-range dependencies in sequences, '
+             'while convolutional layers capture local structure at a fraction of the cost. ')
+
+
+def make_pdf(pages, path):
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(40, 40, 560, 800), f'Page {i + 1}. ' + PARAGRAPH * 14, fontsize=10)
+    doc.save(path)
+    doc.close()
+
+
+def best_time(fn, repeat):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('path', nargs='?', help='PDF file (default: generate one)')
+    parser.add_argument('--pages', type=int, default=400, help='pages of the generated PDF')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8], help='process counts to time')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per setting (best is reported)')
+    args = parser.parse_args()
+
+    path = args.path
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), f'synthetic_{args.pages}p.pdf')
+        make_pdf(args.pages, path)
+    with fitz.open(path) as doc:
+        page_count = doc.page_count
+    print(f'{os.path.basename(path)}: {page_count} pages, {pdf_extractor._usable_cpus()} usable CPUs, '
+          f'auto worker count {pdf_extractor.choose_worker_count(page_count)}')
+
+    serial, expected = best_time(lambda: [t for _, t in pdf_extractor.iter_pdf_pages(path)], args.repeat)
+    per_page = serial / page_count
+    print(f"\n{'mode':>12} {'time':>9} {'pages/s':>9} {'speedup':>8}")
+    print(f"{'serial':>12} {serial * 1000:>7.0f}ms {page_count / serial:>9.0f} {1.0:>7.2f}x")
+
+    indices = list(range(page_count))
+    overheads = {}
+    for workers in args.workers:
+        start = time.perf_counter()
+        pool = pdf_extractor._get_pool(workers)
+        pdf_extractor._warm_up(pool, workers)  # start the processes before timing
+        spawn = time.perf_counter() - start
+        elapsed, texts = best_time(lambda: pdf_extractor._map_pages(path, indices, workers), args.repeat)
+        assert texts == expected, f'{workers} workers returned different text'
+        # Fixed cost of a parallel run: one single-page task per worker, minus the pages' own work
+        tiny, _ = best_time(lambda: pdf_extractor._map_pages(path, list(range(workers)), workers), args.repeat)
+        overheads[workers] = max(0.0, tiny - per_page * workers)
+        print(f"{f'{workers} workers':>12} {elapsed * 1000:>7.0f}ms {page_count / elapsed:>9.0f} "
+              f'{serial / elapsed:>7.2f}x  (pool start-up {spawn * 1000:.0f}ms, '
+              f'per-run overhead {overheads[workers] * 1000:.0f}ms)')
+
+    # With ideal scaling, w workers save per_page * (1 - 1/w) per page, which must cover the overhead
+    print(f'\nserial cost {per_page * 1000:.2f}ms/page; break-even document size with a warm pool:')
+    for workers, overhead in overheads.items():
+        if workers > 1:
+            pages = overhead / (per_page * (1 - 1 / workers))
+            print(f'{workers:>4} workers: {pages:>6.0f} pages')
+
+if __name__ == '__main__':
+    main()
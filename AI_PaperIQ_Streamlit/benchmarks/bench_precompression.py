@@ -0,0 +1,75 @@
+"""
+Prompt-token savings and quality impact of extractive pre-compression.
+
+For each input (PDF or text file) and token budget, reports the prompt tokens
+kept, compression time, and how much of the document the compressed text
+retains according to text_analysis.analyze_texts (cosine similarity and
+keyword overlap against the original). With --summarize, also summarizes the
+full and compressed inputs via llm_service (real API, or GROQ_API_BASE
+pointing at benchmarks/stub_llm_server.py) and compares the summaries' scores.
+
+Usage (from the AI_PaperIQ_Streamlit folder):
+    python benchmarks/bench_precompression.py paper.pdf notes.txt [--budgets 2000 4000] [--summarize]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.extractive import compress_text  # noqa: E402
+from utils.text_analysis import analyze_texts  # noqa: E402
+from utils.tokens import estimate_tokens  # noqa: E402
+
+
+def load_text(path):
+    if path.lower().endswith('.pdf'):
+        from utils import pdf_extractor
+        with open(path, 'rb') as f:
+            return pdf_extractor.extract_text_from_pdf(f)
+    with open(path, encoding='utf-8', errors='ignore') as f:
+        return f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('paths', nargs='+', help='PDF or text files')
+    parser.add_argument('--budgets', type=int, nargs='+', default=[1500, 3000, 6000], help='token budgets')
+    parser.add_argument('--summarize', action='store_true', help='also compare LLM summaries (uses the API)')
+    args = parser.parse_args()
+
+    for path in args.paths:
+        text = load_text(path)
+        tokens = estimate_tokens(text)
+        print(f'\n{os.path.basename(path)}: ~{tokens} tokens')
+        print(f"{'budget':>8} {'kept':>8} {'saved':>7} {'time':>8} {'cosine':>7} {'kw overlap':>10}")
+        for budget in args.budgets:
+            start = time.perf_counter()
+            compressed = compress_text(text, budget)
+            elapsed = time.perf_counter() - start
+            kept = estimate_tokens(compressed)
+            scores = analyze_texts(text, compressed)
+            print(f'{budget:>8} {kept:>8} {1 - kept / max(tokens, 1):>7.0%} {elapsed * 1000:>6.0f}ms '
+                  f"{scores['cosine_similarity']:>7.3f} {scores['keyword_overlap']:>10.2f}")
+
+        if args.summarize:
+            from utils import llm_service
+            budget = args.budgets[0]
+            rows = []
+            for label, setting in (('full input', 0), (f'compressed to {budget}', budget)):
+                llm_service.set_precompression(setting)
+                start = time.perf_counter()
+                summary = llm_service.summarize_text(text)
+                elapsed = time.perf_counter() - start
+                scores = analyze_texts(text, summary)
+                rows.append((label, elapsed, scores))
+            llm_service.set_precompression(0)
+            print(f"\n{'summary of':<24} {'latency':>8} {'cosine':>7} {'kw overlap':>10}")
+            for label, elapsed, scores in rows:
+                print(f"{label:<24} {elapsed:>7.1f}s {scores['cosine_similarity']:>7.3f} "
+                      f"{scores['keyword_overlap']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
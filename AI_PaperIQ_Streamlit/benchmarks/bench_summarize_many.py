@@ -0,0 +1,56 @@
+"""
+Throughput of summarize_many vs. a serial summarize_text loop.
+
+Runs against the local stub Groq endpoint (stub_llm_server.py) with a fixed
+per-request latency, so no API quota is used. The rate limiter is relaxed for the run; against the
+real API, batch throughput is additionally capped by the RPM/TPM budget.
+
+Usage (from the AI_PaperIQ_Streamlit folder):
+    python benchmarks/bench_summarize_many.py [--items 24] [--latency 0.5]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('GROQ_API_KEY', 'benchmark')
+os.environ['LLM_CACHE_BACKEND'] = 'memory'
+
+from utils import llm_service  # noqa: E402
+from utils.key_pool import KeyPool  # noqa: E402
+from utils.rate_limiter import RateLimiter  # noqa: E402
+from stub_llm_server import StubConfig, start_stub_server  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=24)
+    parser.add_argument('--latency', type=float, default=0.5, help='fake API latency in seconds')
+    args = parser.parse_args()
+
+    server = start_stub_server(StubConfig(latency=args.latency))
+    llm_service._GROQ_CHAT_URL = server.chat_url
+    llm_service._key_pool = KeyPool(llm_service._API_KEYS, lambda: RateLimiter(max_per_minute=100000, min_interval=0))
+
+    def run(label, fn):
+        llm_service.clear_cache()
+        texts = [f'{label} abstract {i}: federated learning for healthcare.' for i in range(args.items)]
+        start = time.perf_counter()
+        fn(texts)
+        elapsed = time.perf_counter() - start
+        print(f'{label:<28} {elapsed:7.2f}s  {args.items / elapsed:7.2f} items/s')
+        return elapsed
+
+    print(f'{args.items} items, {args.latency:.2f}s simulated latency per request\n')
+    serial = run('serial summarize_text', lambda texts: [llm_service.summarize_text(t) for t in texts])
+    for concurrency in (2, 4, 8, 16):
+        elapsed = run(f'summarize_many (x{concurrency})',
+                      lambda texts: llm_service.summarize_many(texts, max_concurrency=concurrency))
+        print(f'{"":<28} speed-up vs serial: {serial / elapsed:.1f}x')
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""
+Load generator for llm_service against the local stub LLM server.
+
+Drives make_groq_request_async, the streaming API or summarize_text_async at
+a fixed concurrency and reports throughput, latency percentiles (and time to
+first token when streaming), retries, errors and cache hit rates. A share of
+prompts can repeat to exercise the response cache.
+
+Usage (from the AI_PaperIQ_Streamlit folder):
+    python benchmarks/load_generator.py --requests 200 --concurrency 16 --mode complete
+    python benchmarks/load_generator.py --mode stream --latency-dist lognormal --rate-429 0.05
+    python benchmarks/load_generator.py --keys 3 --rpm 30 --stub-rpm 30   # key-pool scaling
+    python benchmarks/load_generator.py --url http://127.0.0.1:8080   # external stub_llm_server.py
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_llm_server import StubConfig, start_stub_server  # noqa: E402
+
+
+def percentile(samples, p):
+    if not samples:
+        return float('nan')
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mode', choices=['complete', 'stream', 'summarize'], default='complete')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duplicate-ratio', type=float, default=0.2, help='share of prompts that repeat')
+    parser.add_argument('--model', default='llama-3.1-8b-instant')
+    parser.add_argument('--timeout', type=float, default=10.0, help='per-attempt timeout in seconds')
+    parser.add_argument('--rpm', type=int, default=100000, help='client-side requests-per-minute limit per key')
+    parser.add_argument('--keys', type=int, default=1, help='number of (fake) API keys in the pool')
+    parser.add_argument('--url', help='base URL of a running stub_llm_server.py (default: start one in-process)')
+    stub = parser.add_argument_group('in-process stub')
+    stub.add_argument('--latency', type=float, default=0.3)
+    stub.add_argument('--latency-dist', choices=['fixed', 'uniform', 'exponential', 'lognormal'], default='lognormal')
+    stub.add_argument('--tokens-per-second', type=float, default=0.0)
+    stub.add_argument('--rate-429', type=float, default=0.0)
+    stub.add_argument('--retry-after', type=float, default=1.0)
+    stub.add_argument('--timeout-rate', type=float, default=0.0)
+    stub.add_argument('--stub-rpm', type=int, default=0, help='server-side requests per minute per key')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    server = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        server = start_stub_server(StubConfig(
+            latency=args.latency, latency_dist=args.latency_dist, tokens_per_second=args.tokens_per_second,
+            rate_429=args.rate_429, retry_after=args.retry_after, rpm=args.stub_rpm, timeout_rate=args.timeout_rate,
+            hang_seconds=args.timeout * 2, seed=1,
+        ))
+        base_url = server.base_url
+
+    # Configure llm_service for the stub before importing it
+    os.environ['GROQ_API_BASE'] = base_url + '/openai/v1'
+    os.environ['GROQ_API_KEYS'] = ','.join(f'load-test-key-{i}' for i in range(args.keys))
+    os.environ.pop('GROQ_API_KEY', None)
+    os.environ.pop('GOOGLE_API_KEY', None)
+    os.environ['LLM_CACHE_BACKEND'] = 'memory'
+    from utils import http_client, llm_service
+    from utils.key_pool import KeyPool
+    from utils.rate_limiter import RateLimiter
+    llm_service._key_pool = KeyPool(llm_service._API_KEYS, lambda: RateLimiter(max_per_minute=args.rpm, min_interval=0))
+
+    def stub_stats():
+        if server is not None:
+            return server.snapshot()
+        with urllib.request.urlopen(base_url + '/stats') as response:
+            return json.loads(response.read())
+
+    rng = random.Random(7)
+    prompts = []
+    for i in range(args.requests):
+        if prompts and rng.random() < args.duplicate_ratio:
+            prompts.append(rng.choice(prompts))
+        else:
+            prompts.append(f'Request {i}: summarise recent work on federated learning for healthcare. ' * 3)
+
+    latencies, first_tokens, errors = [], [], []
+
+    async def one(prompt):
+        start = time.perf_counter()
+        try:
+            if args.mode == 'complete':
+                await llm_service.make_groq_request_async(args.model, prompt, max_tokens=256, timeout=args.timeout)
+            elif args.mode == 'stream':
+                first = None
+                async for _ in llm_service.stream_groq_request_async(args.model, prompt, max_tokens=256,
+                                                                     timeout=args.timeout):
+                    if first is None:
+                        first = time.perf_counter() - start
+                if first is not None:
+                    first_tokens.append(first)
+            else:
+                await llm_service.summarize_text_async(prompt, preferred=args.model)
+        except Exception as e:
+            errors.append(str(e).splitlines()[0])
+            return
+        latencies.append(time.perf_counter() - start)
+
+    async def run():
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def bounded(prompt):
+            async with semaphore:
+                await one(prompt)
+
+        await asyncio.gather(*(bounded(p) for p in prompts))
+
+    llm_service.reset_telemetry()
+    before = stub_stats()
+    start = time.perf_counter()
+    http_client.run_sync(run())
+    elapsed = time.perf_counter() - start
+    after = stub_stats()
+
+    upstream = {key: after[key] - before.get(key, 0) for key in after}
+    cache = llm_service.get_cache_info()
+    # Retries as llm_service counted them (errors can also happen client-side,
+    # so they cannot be derived from the stub's attempt count)
+    models = llm_service.get_telemetry_snapshot()['summary']['models']
+    retries = sum(entry['retries'] for entry in models.values())
+
+    print(f"mode={args.mode} requests={args.requests} concurrency={args.concurrency} keys={args.keys} "
+          f"duplicates={args.duplicate_ratio:.0%} stub={base_url}\n")
+    print(f"{'elapsed':<22} {elapsed:8.2f}s")
+    print(f"{'throughput':<22} {len(latencies) / elapsed:8.2f} req/s ({len(latencies)} ok, {len(errors)} errors)")
+    for p in (0.50, 0.90, 0.95, 0.99):
+        print(f"{'latency p' + str(int(p * 100)):<22} {percentile(latencies, p) * 1000:8.0f} ms")
+    if first_tokens:
+        print(f"{'first token p50/p95':<22} {percentile(first_tokens, 0.5) * 1000:8.0f} / "
+              f"{percentile(first_tokens, 0.95) * 1000:.0f} ms")
+    print(f"{'upstream attempts':<22} {upstream['chat_requests']:8d} "
+          f"({upstream['rate_limited']} x 429, {upstream['timed_out']} hung)")
+    print(f"{'retries':<22} {retries:8d}")
+    print(f"{'cache hit rate':<22} {cache['hit_rate']:8.1%} ({cache['hits']} hits, {cache['misses']} misses)")
+    if args.mode == 'summarize':
+        semantic = cache['semantic']
+        print(f"{'near-duplicate hits':<22} {semantic['hits']:8d}")
+    if errors:
+        print('\nFirst errors:')
+        for message in errors[:5]:
+            print(f'  {message}')
+
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
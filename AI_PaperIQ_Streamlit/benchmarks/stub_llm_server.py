@@ -0,0 +1,245 @@
+"""
+Local OpenAI-compatible stub of the Groq API for benchmarks and load tests.
+
+Implements POST /openai/v1/chat/completions (JSON and SSE streaming) and
+GET /openai/v1/models (also /models), plus GET /stats with request counters.
+Latency, token throughput, 429s with Retry-After, an RPM limit and hung
+requests (client timeouts) are all configurable, so llm_service can be
+exercised end to end without touching the real API.
+
+Usage (from the AI_PaperIQ_Streamlit folder):
+    python benchmarks/stub_llm_server.py --port 8080 --latency 0.4 --latency-dist lognormal
+    GROQ_API_BASE=http://127.0.0.1:8080/openai/v1 GROQ_API_KEY=stub streamlit run app.py
+
+Or in-process:
+    server = start_stub_server(StubConfig(latency=0.2))
+    url = server.chat_url
+"""
+import json
+import math
+import time
+import random
+import argparse
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+MODELS = ['llama-3.1-8b-instant', 'llama-3.3-70b-versatile', 'mixtral-8x7b-32768']
+
+
+class StubConfig:
+    """
+    Behaviour of the stub server
+
+    latency: mean time to first token / response headers, in seconds
+    latency_dist: 'fixed', 'uniform' (0..2x mean), 'exponential' or 'lognormal'
+    latency_sigma: shape of the lognormal distribution (heavier tail when larger)
+    tokens_per_second: generation speed; completion time adds tokens / rate
+    completion_tokens: tokens generated per reply (capped by the request's max_tokens)
+    rate_429: probability of answering 429 with Retry-After
+    retry_after: Retry-After seconds sent with 429s
+    rpm: requests per minute per API key before every request gets 429 (0 = unlimited)
+    timeout_rate: probability of hanging for hang_seconds (forces client timeouts)
+    """
+
+    def __init__(self, latency=0.3, latency_dist='fixed', latency_sigma=0.5, tokens_per_second=0.0,
+                 completion_tokens=120, rate_429=0.0, retry_after=1.0, rpm=0, timeout_rate=0.0,
+                 hang_seconds=120.0, seed=None):
+        self.latency = latency
+        self.latency_dist = latency_dist
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.rpm = rpm
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        self.random = random.Random(seed)
+
+    def sample_latency(self):
+        mean = self.latency
+        if self.latency_dist == 'uniform':
+            return self.random.uniform(0, 2 * mean)
+        if self.latency_dist == 'exponential':
+            return self.random.expovariate(1 / mean) if mean > 0 else 0.0
+        if self.latency_dist == 'lognormal':
+            # Median 'mean' with a long right tail
+            return self.random.lognormvariate(0, self.latency_sigma) * mean
+        return mean
+
+
+class StubServer(ThreadingHTTPServer):
+    request_queue_size = 128  # the default backlog of 5 stalls concurrent connects
+    daemon_threads = True
+
+    def __init__(self, address, config):
+        super().__init__(address, _Handler)
+        self.config = config
+        self.lock = threading.Lock()
+        self.windows = {}  # API key -> request timestamps, for the RPM limit
+        self.stats = {'chat_requests': 0, 'streamed': 0, 'ok': 0, 'rate_limited': 0, 'timed_out': 0,
+                      'prompt_tokens': 0, 'completion_tokens': 0}
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.server_port}'
+
+    @property
+    def chat_url(self):
+        return self.base_url + '/openai/v1/chat/completions'
+
+    def count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def over_rpm(self, api_key):
+        """Record a request; returns seconds until a slot frees if the key is over its RPM limit, else None"""
+        if not self.config.rpm:
+            return None
+        with self.lock:
+            now = time.monotonic()
+            window = self.windows.setdefault(api_key, deque())
+            while window and now - window[0] >= 60:
+                window.popleft()
+            if len(window) >= self.config.rpm:
+                return 60 - (now - window[0])
+            window.append(now)
+            return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path in ('/models', '/openai/v1/models'):
+            self._send_json(200, {'object': 'list', 'data': [
+                {'id': m, 'object': 'model', 'owned_by': 'stub'} for m in MODELS]})
+        elif self.path == '/stats':
+            self._send_json(200, self.server.snapshot())
+        else:
+            self._send_json(404, {'error': {'message': f'Unknown path {self.path}'}})
+
+    def do_POST(self):
+        if self.path not in ('/chat/completions', '/openai/v1/chat/completions'):
+            self._send_json(404, {'error': {'message': f'Unknown path {self.path}'}})
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        server, config = self.server, self.server.config
+        server.count('chat_requests')
+
+        wait = server.over_rpm(self.headers.get('Authorization', ''))
+        if wait is not None or config.random.random() < config.rate_429:
+            server.count('rate_limited')
+            retry_after = wait if wait is not None else config.retry_after
+            self._send_json(429, {'error': {'message': 'Rate limit reached (stub)'}},
+                            {'Retry-After': str(math.ceil(retry_after))})
+            return
+        if config.random.random() < config.timeout_rate:
+            server.count('timed_out')
+            time.sleep(config.hang_seconds)
+            return
+
+        model = request.get('model', MODELS[0])
+        messages = request.get('messages') or [{'content': ''}]
+        prompt_tokens = max(1, len(messages[-1].get('content', '')) // 4)
+        completion_tokens = max(1, min(config.completion_tokens, request.get('max_tokens') or config.completion_tokens))
+        words = [f'stub{i}' for i in range(completion_tokens)]
+        words[0] = f'📘 **Title:** {model}'
+        usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                 'total_tokens': prompt_tokens + completion_tokens}
+        server.count('prompt_tokens', prompt_tokens)
+        server.count('completion_tokens', completion_tokens)
+
+        time.sleep(config.sample_latency())
+        per_token = 1 / config.tokens_per_second if config.tokens_per_second else 0.0
+        if request.get('stream'):
+            server.count('streamed')
+            self._stream(model, words, usage, per_token)
+        else:
+            time.sleep(per_token * completion_tokens)
+            self._send_json(200, {
+                'id': 'stub', 'object': 'chat.completion', 'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': ' '.join(words)},
+                             'finish_reason': 'stop'}],
+                'usage': usage,
+            })
+        server.count('ok')
+
+    def _stream(self, model, words, usage, per_token):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def send_event(payload):
+            data = f'data: {payload}\n\n'.encode()
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+            self.wfile.flush()
+
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(per_token)
+            delta = {'content': word if i == 0 else ' ' + word}
+            send_event(json.dumps({'model': model, 'choices': [{'index': 0, 'delta': delta}]}))
+        send_event(json.dumps({'model': model, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}],
+                               'x_groq': {'usage': usage}}))
+        send_event('[DONE]')
+        self.wfile.write(b'0\r\n\r\n')
+
+
+def start_stub_server(config=None, port=0):
+    """Start the stub on a daemon thread; returns the StubServer (call .shutdown() when done)"""
+    server = StubServer(('127.0.0.1', port), config or StubConfig())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.3, help='mean latency in seconds')
+    parser.add_argument('--latency-dist', choices=['fixed', 'uniform', 'exponential', 'lognormal'], default='fixed')
+    parser.add_argument('--latency-sigma', type=float, default=0.5)
+    parser.add_argument('--tokens-per-second', type=float, default=0.0, help='0 = instant generation')
+    parser.add_argument('--completion-tokens', type=int, default=120)
+    parser.add_argument('--rate-429', type=float, default=0.0, help='probability of a 429')
+    parser.add_argument('--retry-after', type=float, default=1.0)
+    parser.add_argument('--rpm', type=int, default=0, help='requests per minute per API key before 429s (0 = unlimited)')
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help='probability of a hung request')
+    parser.add_argument('--hang-seconds', type=float, default=120.0)
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency=args.latency, latency_dist=args.latency_dist, latency_sigma=args.latency_sigma,
+        tokens_per_second=args.tokens_per_second, completion_tokens=args.completion_tokens,
+        rate_429=args.rate_429, retry_after=args.retry_after, rpm=args.rpm,
+        timeout_rate=args.timeout_rate, hang_seconds=args.hang_seconds,
+    )
+    server = StubServer(('127.0.0.1', args.port), config)
+    print(f'Stub LLM server on {server.chat_url} (models: {server.base_url}/openai/v1/models)')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,9 @@
+import os
 import streamlit as st
 from utils import llm_service , pdf_extractor, text_analysis
+from utils.chat_context import create_chat_context_from_env
 import time
+import json
 import requests
 import textwrap
 from io import BytesIO
@@ -267,6 +270,10 @@ if "chat_history" not in st.session_state:
         {"role": "assistant", "content": "👋 Hi! I'm your AI research assistant inside AI PaperIQ."}
     ]
 
+# bounded prompt context for Nova (recent turns + rolling summary of older ones)
+if "chat_context" not in st.session_state:
+    st.session_state.chat_context = create_chat_context_from_env(llm_service.summarize_chat_history)
+
 if "user_name" not in st.session_state:
     st.session_state.user_name = "Researcher"
 
@@ -292,17 +299,27 @@ if "arxiv_results" not in st.session_state:
     st.session_state.arxiv_results = []
 if "selected_paper_index" not in st.session_state:
     st.session_state.selected_paper_index = 0
+if "arxiv_prefetch" not in st.session_state:
+    st.session_state.arxiv_prefetch = None  # background summaries of the fetched results
 
 # --------------------------------------------------------------------------------
 # HELPERS
 # --------------------------------------------------------------------------------
-def type_writer(placeholder, text: str, delay: float = 0.012):
-    """Animated typing effect for assistant text."""
+def render_stream(placeholder, chunks, min_interval: float = 0.05) -> str:
+    """Render streamed text chunks into a placeholder and return the full text.
+
+    Redraws happen per chunk (throttled to min_interval), never per character.
+    """
     buf = ""
-    for ch in text:
-        buf += ch
-        placeholder.markdown(buf)
-        time.sleep(delay)
+    last_draw = 0.0
+    for chunk in chunks:
+        buf += chunk
+        now = time.monotonic()
+        if now - last_draw >= min_interval:
+            placeholder.markdown(buf + "▌")
+            last_draw = now
+    placeholder.markdown(buf)
+    return buf
 
 
 def fetch_arxiv_advanced(query: str, max_results: int = 5, category_filter: str | None = None):
@@ -463,13 +480,16 @@ def build_citation(summary_entry: dict) -> tuple[str, str] | tuple[None, None]:
 # --------------------------------------------------------------------------------
 # CHATBOT
 # --------------------------------------------------------------------------------
-def get_chat_response(message, context):
+def stream_chat_response(message, context):
+    """Yield the assistant's reply in chunks as they arrive."""
     msg = message.lower()
 
     if "recommend" in msg or "tip" in msg:
         if not context.get("has_summary"):
-            return "💡 Try **Search topic** mode with a keyword to pull the latest paper from arXiv."
-        return "✨ You can inspect similarity, compression and readability in the Analytics panel."
+            yield "💡 Try **Search topic** mode with a keyword to pull the latest paper from arXiv."
+        else:
+            yield "✨ You can inspect similarity, compression and readability in the Analytics panel."
+        return
 
     try:
         system_prompt = f"""
@@ -481,10 +501,12 @@ Current context:
 
 Keep responses short, friendly and helpful.
 """
-        full = system_prompt + "\n\nUser: " + message
-        return llm_service.generate_chat_response(full)
+        full = st.session_state.chat_context.build(
+            context.get("history", []), message, system_prompt, context.get("summary_entry")
+        )
+        yield from llm_service.generate_chat_response_stream(full)
     except Exception:
-        return "⚠️ I had trouble answering that. Please try again."
+        yield "⚠️ I had trouble answering that. Please try again."
 
 
 def render_chat_ui(mode):
@@ -501,17 +523,20 @@ def render_chat_ui(mode):
         with chat_box:
             st.chat_message("user", avatar="👤").write(prompt)
 
+        summaries = st.session_state.session_summaries
+        index = st.session_state.current_summary_index
         context = {
             "mode": mode,
-            "has_summary": bool(st.session_state.session_summaries),
+            "has_summary": bool(summaries),
+            "summary_entry": summaries[index] if summaries and index is not None else None,
+            "history": st.session_state.chat_history[:-1],  # earlier turns, without this prompt
         }
-        response = get_chat_response(prompt, context)
-
-        st.session_state.chat_history.append({"role": "assistant", "content": response})
         with chat_box:
             msg_container = st.chat_message("assistant", avatar="🤖")
             placeholder = msg_container.empty()
-            type_writer(placeholder, response)
+            response = render_stream(placeholder, stream_chat_response(prompt, context))
+
+        st.session_state.chat_history.append({"role": "assistant", "content": response})
 
 
 # --------------------------------------------------------------------------------
@@ -638,6 +663,10 @@ if mode == "Search topic":
             if not topic.strip():
                 st.error("Please enter a topic to search.")
             else:
+                # a new search makes the previous results' prefetch pointless
+                if st.session_state.arxiv_prefetch is not None:
+                    st.session_state.arxiv_prefetch.cancel()
+                    st.session_state.arxiv_prefetch = None
                 try:
                     st.session_state.arxiv_results = fetch_arxiv_advanced(
                         topic.strip(), max_results=max_results, category_filter=category_filter.strip() or None
@@ -646,6 +675,10 @@ if mode == "Search topic":
                         st.warning("No papers found for this query.")
                     else:
                         st.session_state.selected_paper_index = 0
+                        # start summarizing the abstracts in rank order while the user reads the list
+                        st.session_state.arxiv_prefetch = llm_service.prefetch_summaries(
+                            [p["summary"] for p in st.session_state.arxiv_results], preferred=ai_model
+                        )
                 except Exception as e:
                     st.error(f"ArXiv fetch failed: {e}")
 
@@ -692,11 +725,14 @@ with left_col:
 
         elif mode == "Upload PDF":
             uploaded = st.file_uploader("📄 Upload Research Paper (PDF)", type=["pdf"])
+            page_spec = st.text_input("Pages (optional, e.g. 1-10, 15)", placeholder="All pages")
             if uploaded:
                 with st.spinner("🔄 Extracting text from PDF..."):
                     try:
-                        user_input = pdf_extractor.extract_text_from_pdf(uploaded)
+                        user_input = pdf_extractor.extract_text_from_pdf(uploaded, pages=page_spec.strip() or None)
                         st.success(f"✅ Extracted {len(user_input)} characters from PDF.")
+                    except ValueError as e:
+                        st.error(f"❌ {e}. Adjust the Pages field or leave it empty for all pages.")
                     except Exception as e:
                         st.error(f"❌ Failed to extract text: {e}")
 
@@ -778,11 +814,15 @@ with left_col:
             if content and content.strip():
                 st.session_state.conversation.append({"role": "user", "text": content[:1000] + "..."})
 
-                with st.spinner("🤖 AI is generating your summary..."):
-                    model_choice = (
-                        "pro" if ai_model == "pro" else "flash" if ai_model == "flash" else "auto"
+                model_choice = (
+                    "pro" if ai_model == "pro" else "flash" if ai_model == "flash" else "auto"
+                )
+                with st.chat_message("assistant", avatar="🤖"):
+                    summary_ph = st.empty()
+                    summary_ph.markdown("🤖 AI is generating your summary...")
+                    summary = render_stream(
+                        summary_ph, llm_service.summarize_text_stream(content, preferred=model_choice)
                     )
-                    summary = llm_service.summarize_text(content, preferred=model_choice)
 
                 st.session_state.conversation.append({"role": "ai", "text": summary})
                 # analytics for this summary
@@ -966,6 +1006,66 @@ with right_col:
                     st.write(f"Words (summary): {e.get('analysis',{}).get('summary_word_count','-')}")
                     st.markdown("---")
 
+# --------------------------------------------------------------------------------
+# ADMIN – LLM TELEMETRY
+# --------------------------------------------------------------------------------
+# Process-wide telemetry (and its reset) is only shown to the emails in LLM_ADMIN_EMAILS
+_admin_emails = {e.strip().lower() for e in os.getenv("LLM_ADMIN_EMAILS", "").split(",") if e.strip()}
+if st.session_state.get("user_email", "").lower() in _admin_emails:
+    with st.expander("🛠 LLM telemetry (admin)", expanded=False):
+        telemetry = llm_service.get_telemetry_snapshot(recent=50)
+        models = telemetry["summary"]["models"]
+        if not models:
+            st.info("No LLM calls recorded yet.")
+        else:
+            rows = []
+            for name, m in sorted(models.items()):
+                hist = m["histograms"]
+                latency = hist.get("latency_seconds", {})
+                queue = hist.get("queue_wait_seconds", {})
+                rows.append({
+                    "model": name,
+                    "calls": m["calls"],
+                    "cache hits": m["by_cache"].get("hit", 0) + m["by_cache"].get("coalesced", 0),
+                    "errors": m["calls"] - m["by_status"].get("ok", 0),
+                    "retries": m["retries"],
+                    "latency p50 (s)": latency.get("p50"),
+                    "latency p95 (s)": latency.get("p95"),
+                    "queue wait p95 (s)": queue.get("p95"),
+                    "prompt tokens": m["tokens"].get("prompt", 0),
+                    "completion tokens": m["tokens"].get("completion", 0),
+                })
+            st.dataframe(rows, use_container_width=True, hide_index=True)
+            st.caption("Latency percentiles are histogram bucket upper bounds.")
+
+            st.markdown("**HTTP status codes**")
+            st.write(telemetry["summary"]["status_codes"] or "-")
+            st.markdown("**Recent calls**")
+            st.dataframe(list(reversed(telemetry["recent"])), use_container_width=True, hide_index=True)
+
+        rate = llm_service.get_rate_limit_status()
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Requests (last min)", rate["requests_last_minute"])
+        m2.metric("Tokens left (min)", rate.get("tokens_remaining_in_minute", "-"))
+        m3.metric("Groq circuit", rate["circuit_breaker"]["state"])
+        st.markdown("**Request queue by priority**")
+        st.dataframe(
+            [dict(priority=name, **cls) for name, cls in rate["scheduler"]["classes"].items()],
+            use_container_width=True, hide_index=True,
+        )
+
+        d1, d2, d3 = st.columns(3)
+        with d1:
+            st.download_button("⬇ Prometheus metrics", telemetry["prometheus"], file_name="llm_metrics.prom",
+                               mime="text/plain", use_container_width=True)
+        with d2:
+            st.download_button("⬇ JSON metrics", json.dumps(telemetry["summary"], indent=2),
+                               file_name="llm_metrics.json", mime="application/json", use_container_width=True)
+        with d3:
+            if st.button("Reset telemetry", use_container_width=True):
+                llm_service.reset_telemetry()
+                st.rerun()
+
 # --------------------------------------------------------------------------------
 # FOOTER
 # --------------------------------------------------------------------------------
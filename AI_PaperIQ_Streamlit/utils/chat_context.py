@@ -0,0 +1,130 @@
+import os
+
+from utils.tokens import CHARS_PER_TOKEN, estimate_tokens
+
+
+def _truncate(text, max_tokens):
+    """Cut text to roughly max_tokens, marking the cut"""
+    max_chars = max(0, max_tokens) * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max(0, max_chars - 1)].rstrip() + '…'
+
+
+def _format_turn(msg):
+    speaker = 'User' if msg['role'] == 'user' else 'Assistant'
+    return f"{speaker}: {msg['content']}"
+
+
+class ChatContext:
+    """
+    Builds bounded chat prompts from an unbounded conversation.
+
+    The last keep_turns exchanges (user + assistant messages) are sent
+    verbatim. Older messages are folded into a rolling summary via the
+    summarize(previous_summary, transcript) callable, in batches of
+    fold_every exchanges so most turns need no extra call; the summary and how
+    many messages it covers are kept on the object (one per chat session).
+    build() packs the system text, the active summary entry's key fields, the
+    rolling summary and the newest turns into token_budget.
+    """
+
+    def __init__(self, summarize=None, token_budget=3000, keep_turns=4, fold_every=None, summary_tokens=300,
+                 entry_share=0.4):
+        self.summarize = summarize
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.fold_every = fold_every or keep_turns
+        self.summary_tokens = summary_tokens
+        self.entry_share = entry_share
+        self.rolling_summary = ''
+        self.folded = 0  # history messages already covered by rolling_summary
+
+    def reset(self):
+        self.rolling_summary = ''
+        self.folded = 0
+
+    def _fold(self, history):
+        """Fold messages older than the verbatim window into the rolling summary when a batch is due"""
+        if len(history) < self.folded:
+            self.reset()  # history was cleared or replaced
+        older_end = max(0, len(history) - 2 * self.keep_turns)
+        if self.summarize is None or older_end - self.folded < 2 * self.fold_every:
+            return
+        transcript = '\n'.join(_format_turn(m) for m in history[self.folded:older_end])
+        try:
+            self.rolling_summary = self.summarize(self.rolling_summary, transcript).strip()
+            self.folded = older_end
+        except Exception as e:
+            # Keep the unfolded messages; they are sent verbatim while they fit
+            print(f"Chat history summarization failed: {e}")
+
+    @staticmethod
+    def _entry_block(entry, max_tokens):
+        fields = [f"- {label}: {entry[key]}" for label, key in (('Title', 'title'), ('Topic', 'topic'),
+                                                                  ('Mode', 'mode')) if entry.get(key)]
+        header = '\n'.join(fields)
+        summary = entry.get('summary_text') or ''
+        room = max_tokens - estimate_tokens(header) - 8
+        if summary and room > 20:
+            header += '\n- Summary: ' + _truncate(summary, room)
+        return 'Active summary:\n' + header if header else ''
+
+    def build(self, history, message, system='', summary_entry=None):
+        """
+        Pack a prompt for the next reply
+
+        Args:
+            history: Earlier messages as {'role', 'content'} dicts, oldest first,
+                     not including message
+            message: The new user message
+            system: Instructions placed first
+            summary_entry: Active session summary (title, topic, mode, summary_text), if any
+
+        Returns:
+            str: Prompt within token_budget (the system text and message are never cut,
+            so a single huge message can still exceed it)
+        """
+        self._fold(history)
+        remaining = self.token_budget - estimate_tokens(system) - estimate_tokens(message) - 10
+
+        sections = []
+        if summary_entry:
+            block = self._entry_block(summary_entry, int(remaining * self.entry_share))
+            if block:
+                sections.append(block)
+                remaining -= estimate_tokens(block)
+        if self.rolling_summary:
+            block = 'Earlier in this conversation:\n' + _truncate(
+                self.rolling_summary, min(self.summary_tokens, max(0, remaining // 2)))
+            sections.append(block)
+            remaining -= estimate_tokens(block)
+
+        # Newest turns first until the budget runs out (unfolded older ones included if they fit)
+        turns = []
+        for msg in reversed(history[self.folded:]):
+            line = _format_turn(msg)
+            cost = estimate_tokens(line) + 1
+            if cost > remaining:
+                break
+            turns.append(line)
+            remaining -= cost
+        if turns:
+            sections.append('Recent conversation:\n' + '\n'.join(reversed(turns)))
+
+        return '\n\n'.join(part for part in [system.strip(), *sections, 'User: ' + message] if part)
+
+    def status(self):
+        return {'rolling_summary_tokens': estimate_tokens(self.rolling_summary), 'folded_messages': self.folded}
+
+
+def create_chat_context_from_env(summarize=None):
+    """
+    Build a ChatContext from CHAT_CONTEXT_TOKENS (prompt budget) and
+    CHAT_KEEP_TURNS (exchanges kept verbatim)
+    """
+    return ChatContext(
+        summarize=summarize,
+        token_budget=int(os.getenv('CHAT_CONTEXT_TOKENS', '3000')),
+        keep_turns=int(os.getenv('CHAT_KEEP_TURNS', '4')),
+    )
@@ -0,0 +1,151 @@
+import time
+import threading
+from collections import deque
+
+from utils.llm_providers import ProviderUnavailableError
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(ProviderUnavailableError):
+    """Raised instead of calling an endpoint whose circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open circuit breaker with rolling error-rate and latency windows.
+
+    closed:    calls pass; outcomes are recorded over the last window_seconds.
+               The circuit opens once at least min_calls were seen and either
+               the failure rate or the slow-call rate reaches its threshold.
+    open:      calls fail fast with CircuitOpenError (a ProviderUnavailableError,
+               so the provider router fails over) until open_seconds pass.
+    half_open: exactly one probe call is let through; success closes the
+               circuit, failure re-opens it. Other calls are rejected with a
+               short retry_after (probe_retry_seconds), so a router cooling the
+               provider down by it picks it up again soon after the probe succeeds.
+    """
+
+    def __init__(self, name, failure_rate_threshold=0.5, slow_call_rate_threshold=0.8,
+                 slow_call_seconds=30.0, min_calls=5, window_seconds=60.0, open_seconds=30.0,
+                 probe_retry_seconds=1.0, clock=time.monotonic):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.probe_retry_seconds = probe_retry_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._calls = deque()  # (timestamp, ok, latency)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def _trim(self, now):
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    def _rates(self):
+        total = len(self._calls)
+        if not total:
+            return 0.0, 0.0
+        failures = sum(1 for _, ok, _ in self._calls if not ok)
+        slow = sum(1 for _, _, latency in self._calls if latency >= self.slow_call_seconds)
+        return failures / total, slow / total
+
+    def _open(self, now):
+        self._state = OPEN
+        self._opened_at = now
+        self._probe_in_flight = False
+        print(f"🔌 Circuit '{self.name}' opened; failing fast for {self.open_seconds:.0f}s")
+
+    def before_call(self):
+        """
+        Ask permission to call the endpoint
+
+        Returns:
+            bool: True if this call is the half-open recovery probe
+
+        Raises:
+            CircuitOpenError: while open, or while a half-open probe is in flight
+        """
+        with self._lock:
+            now = self._clock()
+            if self._state == OPEN:
+                remaining = self._opened_at + self.open_seconds - now
+                if remaining > 0:
+                    raise CircuitOpenError(
+                        f"{self.name} is unavailable (circuit open, retry in {remaining:.0f}s)",
+                        retry_after=remaining,
+                    )
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == HALF_OPEN:
+                if self._probe_in_flight:
+                    raise CircuitOpenError(f"{self.name} is recovering (probe in flight)",
+                                           retry_after=self.probe_retry_seconds)
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def raise_if_open(self):
+        """Abort pending retries once the circuit has opened (does not admit probes)"""
+        with self._lock:
+            if self._state == OPEN:
+                remaining = max(0.0, self._opened_at + self.open_seconds - self._clock())
+                raise CircuitOpenError(f"{self.name} is unavailable (circuit opened)", retry_after=remaining)
+
+    def release_probe(self):
+        """Free the half-open probe slot if the probe ended without a recorded outcome"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self, latency):
+        with self._lock:
+            now = self._clock()
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._probe_in_flight = False
+                self._calls.clear()
+                print(f"🔌 Circuit '{self.name}' closed; endpoint recovered")
+            self._calls.append((now, True, latency))
+            self._trim(now)
+            self._evaluate(now)
+
+    def record_failure(self, latency):
+        with self._lock:
+            now = self._clock()
+            if self._state == HALF_OPEN:
+                self._open(now)
+                return
+            self._calls.append((now, False, latency))
+            self._trim(now)
+            self._evaluate(now)
+
+    def _evaluate(self, now):
+        if self._state != CLOSED or len(self._calls) < self.min_calls:
+            return
+        failure_rate, slow_rate = self._rates()
+        if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+            self._open(now)
+
+    def status(self):
+        with self._lock:
+            now = self._clock()
+            self._trim(now)
+            failure_rate, slow_rate = self._rates()
+            latencies = sorted(latency for _, ok, latency in self._calls if ok)
+            return {
+                'state': self._state,
+                'calls_in_window': len(self._calls),
+                'failure_rate': round(failure_rate, 3),
+                'slow_call_rate': round(slow_rate, 3),
+                'p95_latency': latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] if latencies else None,
+                'seconds_until_probe': round(max(0.0, self._opened_at + self.open_seconds - now), 1)
+                if self._state == OPEN else 0.0,
+            }
@@ -0,0 +1,91 @@
+import time
+import asyncio
+import contextvars
+from contextlib import contextmanager
+
+# Absolute time.monotonic() by which the current call must finish (None = no deadline);
+# asyncio copies it into tasks started inside, so retries, hedges and map-reduce chunks share it
+_deadline = contextvars.ContextVar('llm_deadline', default=None)
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when an LLM call cannot finish within the caller's deadline"""
+
+    def __init__(self, message='Deadline exceeded', deadline=None):
+        super().__init__(message)
+        self.deadline = deadline
+
+
+def current_deadline():
+    """Absolute monotonic deadline of the current context, or None"""
+    return _deadline.get()
+
+
+def remaining():
+    """Seconds left before the current deadline (None if there is none; may be negative)"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+@contextmanager
+def deadline_scope(seconds=None, at=None):
+    """
+    Bound the enclosed calls by a time budget
+
+    Args:
+        seconds: Budget from now
+        at: Absolute time.monotonic() deadline (e.g. one captured earlier)
+
+    An enclosing, earlier deadline still applies: the tighter of the two wins.
+    With neither argument the scope changes nothing.
+    """
+    candidates = [d for d in (_deadline.get(), at, None if seconds is None else time.monotonic() + seconds)
+                  if d is not None]
+    token = _deadline.set(min(candidates) if candidates else None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def check(what='LLM call'):
+    """Raise DeadlineExceededError if the current deadline has passed"""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceededError(f'{what} exceeded its deadline', _deadline.get())
+
+
+def clip_timeout(timeout, what='LLM call'):
+    """Per-attempt timeout limited to the time left; raises if none is left"""
+    check(what)
+    left = remaining()
+    if left is None:
+        return timeout
+    return left if timeout is None else min(timeout, left)
+
+
+def ensure_time_for(seconds, what='LLM call'):
+    """Raise now if waiting `seconds` (a backoff or queue wait) would overrun the deadline"""
+    left = remaining()
+    if left is not None and seconds >= left:
+        raise DeadlineExceededError(
+            f'{what} cannot finish within its deadline ({left:.1f}s left, {seconds:.1f}s wait needed)',
+            _deadline.get(),
+        )
+
+
+async def within_deadline(awaitable, what='LLM call'):
+    """Await something that may block indefinitely (queue, in-flight result), bounded by the deadline"""
+    left = remaining()
+    if left is None:
+        return await awaitable
+    if left <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        check(what)
+    try:
+        return await asyncio.wait_for(awaitable, left)
+    except DeadlineExceededError:
+        raise  # an inner stage ran out first; keep its message (it is a TimeoutError subclass)
+    except asyncio.TimeoutError:
+        raise DeadlineExceededError(f'{what} exceeded its deadline while waiting', _deadline.get()) from None
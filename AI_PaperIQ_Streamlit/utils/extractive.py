@@ -0,0 +1,111 @@
+import re
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from utils.text_cleanup import drop_page_furniture
+from utils.tokens import CHARS_PER_TOKEN
+
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9(\[])')
+_REFERENCES_RE = re.compile(r'^\s*(\d+\.?\s*)?(references|bibliography|works cited)\s*:?\s*$', re.IGNORECASE)
+_CITATION_LINE_RE = re.compile(r'^\s*\[\d+\]\s')
+
+
+def strip_boilerplate(text):
+    """
+    Drop text that never helps a summary
+
+    Removes the reference list (a References/Bibliography heading in the second
+    half of the document and everything after it), "[n] ..." citation lines,
+    page-number lines and header/footer lines repeated on many pages.
+    """
+    lines = text.splitlines()
+    for i in range(len(lines) // 2, len(lines)):
+        if _REFERENCES_RE.match(lines[i]):
+            lines = lines[:i]
+            break
+    kept = [line for line in drop_page_furniture(lines) if not _CITATION_LINE_RE.match(line)]
+    return '\n'.join(kept)
+
+
+def split_sentences(text):
+    """Split on sentence-ending punctuation; line-wrapped PDF text is re-joined first"""
+    flat = re.sub(r'\s+', ' ', text).strip()
+    return [s for s in _SENTENCE_END_RE.split(flat) if len(s.split()) >= 3]
+
+
+def textrank_scores(sentences, damping=0.85, max_iter=100, tol=1e-6):
+    """
+    TextRank centrality of each sentence
+
+    Sentences are TF-IDF vectors (L2-normalised, so X @ X.T is the cosine
+    similarity graph, kept sparse); PageRank runs as sparse mat-vec power
+    iteration on the row-normalised graph.
+
+    Returns:
+        numpy array of scores (sums to 1)
+    """
+    n = len(sentences)
+    if n == 0:
+        return np.zeros(0)
+    try:
+        X = TfidfVectorizer(stop_words='english', sublinear_tf=True).fit_transform(sentences)
+    except ValueError:  # only stop words
+        return np.full(n, 1.0 / n)
+    graph = (X @ X.T).tocsr()
+    graph.setdiag(0)
+    graph.eliminate_zeros()
+
+    out_weight = np.asarray(graph.sum(axis=1)).ravel()
+    dangling = out_weight == 0
+    out_weight[dangling] = 1.0
+    transition = sparse.diags(1.0 / out_weight) @ graph  # row-stochastic (except dangling rows)
+    transition_t = transition.T.tocsr()
+
+    scores = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        # Dangling sentences spread their score uniformly
+        updated = (1 - damping) / n + damping * (transition_t @ scores + scores[dangling].sum() / n)
+        if np.abs(updated - scores).sum() < tol:
+            scores = updated
+            break
+        scores = updated
+    return scores / scores.sum()
+
+
+def compress_text(text, token_budget, chars_per_token=CHARS_PER_TOKEN, lead_sentences=3):
+    """
+    Extractive pre-compression: keep the most central sentences within a token budget
+
+    Args:
+        text: Document text (e.g. from PDF extraction)
+        token_budget: Approximate prompt tokens to keep
+        chars_per_token: Characters per token when converting the budget (see utils.tokens)
+        lead_sentences: Opening sentences (title/abstract) that are always kept
+
+    Returns:
+        str: Selected sentences in their original order, or the cleaned text if it
+        already fits the budget
+    """
+    budget_chars = token_budget * chars_per_token
+    cleaned = strip_boilerplate(text)
+    if len(cleaned) <= budget_chars:
+        return cleaned
+
+    sentences = split_sentences(cleaned)
+    if not sentences:
+        return cleaned[:budget_chars]
+    scores = textrank_scores(sentences)
+    lead = min(lead_sentences, len(sentences))
+    # Lead sentences first, then the rest by centrality
+    order = list(range(lead)) + [i for i in np.argsort(-scores) if i >= lead]
+
+    chosen, used = [], 0
+    for i in order:
+        cost = len(sentences[i]) + 1
+        if used + cost > budget_chars:
+            continue
+        chosen.append(i)
+        used += cost
+    return ' '.join(sentences[i] for i in sorted(chosen))
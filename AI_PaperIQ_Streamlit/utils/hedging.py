@@ -0,0 +1,237 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+
+
+class HedgePolicy:
+    """
+    Decides when to send a backup ("hedged") request and keeps the hedge budget.
+
+    A backup is sent once the primary has taken longer than the given
+    percentile of recent latencies for that model (full response, or first
+    token when streaming). Until min_samples latencies are known no hedging
+    happens. Backups are capped at budget_fraction of the per-minute request
+    quota so hedging can never eat the quota real requests need.
+    """
+
+    def __init__(self, enabled=False, percentile=0.95, budget_fraction=0.1, backup_model=None,
+                 min_samples=10, window=100):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.budget_fraction = budget_fraction
+        self.backup_model = backup_model  # None means hedge on the same model
+        self.min_samples = min_samples
+        self._window = window
+        self._latencies = {}  # (kind, model) -> deque of seconds
+        self._hedges = deque()  # monotonic timestamps of hedges sent
+        self._lock = threading.Lock()
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self.budget_denied = 0
+
+    def configure(self, **overrides):
+        for key, value in overrides.items():
+            if not hasattr(self, key) or key.startswith('_'):
+                raise ValueError(f"Unknown hedging setting: {key}")
+            setattr(self, key, value)
+
+    def record(self, kind, model, seconds):
+        """Record a latency sample; kind is 'response' or 'first_token'"""
+        with self._lock:
+            self._latencies.setdefault((kind, model), deque(maxlen=self._window)).append(seconds)
+
+    def deadline(self, kind, model):
+        """Seconds to wait on the primary before hedging, or None if unknown"""
+        with self._lock:
+            samples = sorted(self._latencies.get((kind, model), ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(self.percentile * len(samples)))]
+
+    def backup_for(self, model):
+        return self.backup_model or model
+
+    def record_win(self, won_by_backup):
+        if won_by_backup:
+            with self._lock:
+                self.hedges_won += 1
+
+    def try_acquire(self, max_per_minute):
+        """Take one hedge from the budget; False once this minute's share is used"""
+        with self._lock:
+            now = time.monotonic()
+            while self._hedges and now - self._hedges[0] >= 60:
+                self._hedges.popleft()
+            if len(self._hedges) + 1 > self.budget_fraction * max_per_minute:
+                self.budget_denied += 1
+                return False
+            self._hedges.append(now)
+            self.hedges_sent += 1
+            return True
+
+    def status(self):
+        with self._lock:
+            now = time.monotonic()
+            return {
+                'enabled': self.enabled,
+                'percentile': self.percentile,
+                'budget_fraction': self.budget_fraction,
+                'backup_model': self.backup_model or 'same',
+                'hedges_last_minute': sum(1 for t in self._hedges if now - t < 60),
+                'hedges_sent': self.hedges_sent,
+                'hedges_won': self.hedges_won,
+                'budget_denied': self.budget_denied,
+            }
+
+
+async def _cancel(task):
+    task.cancel()
+    try:
+        await task
+    except BaseException:
+        pass
+
+
+async def _wait_until_sent(primary, started):
+    """Wait for the started event (or for primary to finish before it is set)"""
+    waiter = asyncio.ensure_future(started.wait())
+    try:
+        await asyncio.wait({primary, waiter}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        waiter.cancel()
+
+
+async def race(primary, start_backup, delay, started=None):
+    """
+    Await primary; if it is still pending after delay seconds, call
+    start_backup() for a second awaitable and return whichever succeeds first.
+
+    start_backup returns None when no backup may be sent. The losing task is
+    cancelled; if one side fails, the other is still awaited. If started (an
+    asyncio.Event) is given, the delay only counts from when it is set, i.e.
+    once the primary request has actually been sent: time spent queueing for
+    a rate-limit slot is not latency a backup could beat.
+
+    Returns:
+        (result, won_by_backup)
+    """
+    primary = asyncio.ensure_future(primary)
+    if started is not None:
+        await _wait_until_sent(primary, started)
+        if primary.done():
+            return primary.result(), False
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done:
+        return primary.result(), False
+
+    backup_coro = start_backup()
+    if backup_coro is None:
+        return await primary, False
+    backup = asyncio.ensure_future(backup_coro)
+
+    pending = {primary, backup}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), task is backup
+            if not pending:
+                # Both failed: surface the primary's error
+                return primary.result(), False
+    finally:
+        for task in (primary, backup):
+            if not task.done():
+                await _cancel(task)
+
+
+async def race_streams(primary, start_backup, delay, on_winner=None, started=None):
+    """
+    Streaming counterpart of race(): hedge on time to first item.
+
+    Each stream is drained by its own task (so HTTP streams stay inside one
+    task) into a shared queue. The first stream to yield an item wins and the
+    other is cancelled; a stream that fails before yielding lets the other
+    one win. on_winner(won_by_backup) is called once a winner is known.
+    As in race(), the delay counts from when started is set, if given.
+    """
+    queue = asyncio.Queue()
+
+    async def signal_started():
+        await started.wait()
+        await queue.put((0, 'started', None))
+
+    async def pump(index, agen):
+        try:
+            async for item in agen:
+                await queue.put((index, 'item', item))
+            await queue.put((index, 'done', None))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put((index, 'error', e))
+
+    tasks = [asyncio.ensure_future(pump(0, primary))]
+    timer = asyncio.ensure_future(signal_started()) if started is not None else None
+    winner = None
+    errors = {}
+    try:
+        while True:
+            try:
+                index, kind, value = await asyncio.wait_for(
+                    queue.get(), delay if winner is None and timer is None else None)
+            except asyncio.TimeoutError:
+                delay = None
+                backup = start_backup()
+                if backup is not None:
+                    tasks.append(asyncio.ensure_future(pump(1, backup)))
+                continue
+            if kind == 'started':
+                timer = None  # the primary is on the wire: start the hedge clock
+                continue
+            if winner is None:
+                if kind == 'error':
+                    errors[index] = value
+                    if len(errors) == len(tasks):
+                        raise errors[0]
+                    continue
+                winner = index
+                for i, task in enumerate(tasks):
+                    if i != winner:
+                        await _cancel(task)
+                if on_winner is not None:
+                    on_winner(winner == 1)
+            if index != winner:
+                continue
+            if kind == 'item':
+                yield value
+            elif kind == 'done':
+                return
+            else:
+                raise value
+    finally:
+        if timer is not None:
+            await _cancel(timer)
+        for task in tasks:
+            if not task.done():
+                await _cancel(task)
+
+
+def create_policy_from_env():
+    """
+    Build the hedge policy from environment variables
+
+    GROQ_HEDGE_ENABLED: 1 to enable hedged requests (default off)
+    GROQ_HEDGE_PERCENTILE: latency percentile used as the hedge deadline (default 0.95)
+    GROQ_HEDGE_BUDGET: max fraction of the per-minute request quota spent on hedges (default 0.1)
+    GROQ_HEDGE_MODEL: backup model, or 'same' to hedge on the primary model (default llama-3.1-8b-instant)
+    """
+    backup_model = os.getenv('GROQ_HEDGE_MODEL', 'llama-3.1-8b-instant')
+    return HedgePolicy(
+        enabled=os.getenv('GROQ_HEDGE_ENABLED', '0').lower() in ('1', 'true', 'yes'),
+        percentile=float(os.getenv('GROQ_HEDGE_PERCENTILE', '0.95')),
+        budget_fraction=float(os.getenv('GROQ_HEDGE_BUDGET', '0.1')),
+        backup_model=None if backup_model == 'same' else backup_model,
+    )
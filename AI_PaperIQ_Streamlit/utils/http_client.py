@@ -0,0 +1,167 @@
+import os
+import asyncio
+import threading
+
+import httpx
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx when installed)
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+# Pool configuration (override through environment variables)
+_MAX_CONNECTIONS = int(os.getenv('HTTP_POOL_MAX_CONNECTIONS', '100'))
+_MAX_KEEPALIVE = int(os.getenv('HTTP_POOL_MAX_KEEPALIVE', '20'))
+_KEEPALIVE_EXPIRY = float(os.getenv('HTTP_POOL_KEEPALIVE_EXPIRY', '30'))
+_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '10'))
+_DEFAULT_TIMEOUT = 60.0
+
+
+class AsyncHTTPClient:
+    """
+    Shared keep-alive connection pool for outbound API calls.
+
+    One httpx.AsyncClient lives on a dedicated background event loop, so every
+    Streamlit session thread reuses the same TCP/TLS connections (HTTP/2 when the
+    'h2' package is installed) and many requests can be in flight without one
+    thread per request. Async callers await the coroutines directly; sync
+    callers use the *_sync wrappers, which block only the calling thread.
+    """
+
+    def __init__(self, max_connections=_MAX_CONNECTIONS, max_keepalive=_MAX_KEEPALIVE,
+                 keepalive_expiry=_KEEPALIVE_EXPIRY, http2=_HTTP2_AVAILABLE):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self._loop = None
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        """The background event loop, started on first use"""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name='http-client-loop', daemon=True)
+                thread.start()
+                self._loop = loop
+            return self._loop
+
+    def _get_client(self):
+        # Only called on the background loop, so no locking is needed
+        if self._client is None:
+            self._client = httpx.AsyncClient(limits=self.limits, http2=self.http2)
+        return self._client
+
+    @staticmethod
+    def _timeout(timeout):
+        if timeout is None:
+            timeout = _DEFAULT_TIMEOUT
+        return httpx.Timeout(timeout, connect=min(timeout, _CONNECT_TIMEOUT))
+
+    async def _on_loop(self, coro):
+        """Await coro on the background loop, from whichever loop we are running in"""
+        if asyncio.get_running_loop() is self.loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    async def _request(self, method, url, timeout=None, **kwargs):
+        response = await self._get_client().request(method, url, timeout=self._timeout(timeout), **kwargs)
+        await response.aread()
+        return response
+
+    async def request(self, method, url, timeout=None, **kwargs):
+        """
+        Send a request through the shared pool and return the fully read response
+
+        Args:
+            method: HTTP method
+            url: Target URL
+            timeout: Per-request timeout in seconds (default 60)
+            **kwargs: Passed to httpx (headers, json, params, ...)
+        """
+        return await self._on_loop(self._request(method, url, timeout=timeout, **kwargs))
+
+    def stream(self, method, url, timeout=None, **kwargs):
+        """
+        Open a streaming request (async context manager yielding an httpx.Response)
+
+        Must be entered on the client's loop, i.e. from a coroutine or async
+        generator driven by run_sync/iterate_sync or awaited via request().
+        """
+        return self._get_client().stream(method, url, timeout=self._timeout(timeout), **kwargs)
+
+    def run_sync(self, coro, timeout=None):
+        """Run a coroutine on the background loop and block for its result"""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        return future.result(timeout)
+
+    def submit(self, coro):
+        """Start a coroutine on the background loop without waiting; cancel() the returned Future to stop it"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def iterate_sync(self, agen):
+        """Drive an async generator on the background loop from synchronous code"""
+        try:
+            while True:
+                try:
+                    item = self.run_sync(agen.__anext__())
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            self.run_sync(agen.aclose())
+
+    def request_sync(self, method, url, timeout=None, **kwargs):
+        """Synchronous wrapper around request() for Streamlit callers"""
+        return self.run_sync(self._request(method, url, timeout=timeout, **kwargs))
+
+    def close(self):
+        """Close pooled connections (they are reopened on next use)"""
+        if self._loop is None or self._client is None:
+            return
+        client, self._client = self._client, None
+        self.run_sync(client.aclose())
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide shared client"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = AsyncHTTPClient()
+        return _default_client
+
+
+def request(method, url, timeout=None, **kwargs):
+    """Synchronous request through the shared connection pool"""
+    return get_client().request_sync(method, url, timeout=timeout, **kwargs)
+
+
+async def arequest(method, url, timeout=None, **kwargs):
+    """Asynchronous request through the shared connection pool"""
+    return await get_client().request(method, url, timeout=timeout, **kwargs)
+
+
+def run_sync(coro, timeout=None):
+    """Run a coroutine on the shared client's loop and wait for the result"""
+    return get_client().run_sync(coro, timeout)
+
+
+def submit(coro):
+    """Start a coroutine on the shared client's loop; returns a concurrent.futures.Future"""
+    return get_client().submit(coro)
+
+
+def iterate_sync(agen):
+    """Iterate an async generator on the shared client's loop from sync code"""
+    return get_client().iterate_sync(agen)
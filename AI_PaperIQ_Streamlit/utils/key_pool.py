@@ -0,0 +1,196 @@
+import os
+import re
+import time
+import asyncio
+import threading
+
+
+def load_keys(name, secrets=None):
+    """
+    Collect API keys for a provider from the environment and Streamlit secrets
+
+    Reads <name>S (comma/whitespace separated list) and <name> (single key),
+    e.g. GROQ_API_KEYS and GROQ_API_KEY, keeping first-seen order without duplicates.
+    """
+    raw = [os.getenv(name + 'S', ''), os.getenv(name, '')]
+    if secrets is not None:
+        for key in (name + 'S', name):
+            try:
+                value = secrets.get(key, '')
+            except Exception:
+                value = ''
+            raw.append(','.join(value) if isinstance(value, (list, tuple)) else str(value or ''))
+    keys = []
+    for value in raw:
+        for key in re.split(r'[\s,]+', value.strip()):
+            if key and key not in keys:
+                keys.append(key)
+    return keys
+
+
+class PooledKey:
+    """One API key with its own rate limiter and health state"""
+
+    def __init__(self, key, limiter):
+        self.key = key
+        self.limiter = limiter
+        self.failures = 0  # consecutive 401/403/429 responses
+        self.last_failure_at = None  # when the last counted failure was reported
+        self.benched_until = 0.0
+        self.last_status = None
+
+    @property
+    def label(self):
+        return f'…{self.key[-4:]}' if len(self.key) > 8 else '…'
+
+
+class KeyPool:
+    """
+    Spreads requests over several API keys, each with its own limiter.
+
+    reserve()/acquire_async() send each request to the key whose limiter can
+    start it soonest (most remaining budget). A key that returns bench_after
+    consecutive 401/403/429 responses is set aside: for auth_bench_seconds
+    after auth failures, or for Retry-After (bench_seconds if absent) after 429s.
+    Failures of requests that were already in flight when the previous failure
+    came back are the same episode, not a repeat, and are not counted.
+    When every key is benched the one coming back first is used anyway.
+    """
+
+    def __init__(self, keys, limiter_factory, bench_after=2, bench_seconds=60.0, auth_bench_seconds=3600.0,
+                 clock=time.monotonic):
+        self.keys = [PooledKey(key, limiter_factory()) for key in keys]
+        self.bench_after = bench_after
+        self.bench_seconds = bench_seconds
+        self.auth_bench_seconds = auth_bench_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _candidates(self, exclude=None):
+        now = self._clock()
+        excluded = exclude if isinstance(exclude, (set, frozenset, list, tuple)) else {exclude}
+        keys = [k for k in self.keys if k not in excluded] or self.keys
+        ready = [k for k in keys if k.benched_until <= now]
+        return ready or [min(keys, key=lambda k: k.benched_until)]
+
+    def benched_seconds(self):
+        """Seconds until the first key comes back when every key is set aside; 0.0 if any is usable"""
+        with self._lock:
+            now = self._clock()
+            return max(0.0, min((k.benched_until - now for k in self.keys), default=0.0))
+
+    def has_fresh_key(self, exclude=(), tokens=0, within=1.0):
+        """True if a key outside exclude could start a request within `within` seconds (worth moving a
+        rejected request to at once rather than retrying on the same key)"""
+        with self._lock:
+            now = self._clock()
+            return any(k not in exclude and max(k.limiter.peek(tokens), k.benched_until - now) <= within
+                       for k in self.keys)
+
+    def rejected(self):
+        """True if every key is set aside after 401/403s (waiting will not help)"""
+        with self._lock:
+            now = self._clock()
+            return bool(self.keys) and all(k.benched_until > now and k.last_status in (401, 403)
+                                           for k in self.keys)
+
+    def peek(self, tokens=0):
+        """Seconds until some key could start a request of this size, without reserving"""
+        if not self.keys:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            return min(max(k.limiter.peek(tokens), k.benched_until - now) for k in self._candidates())
+
+    def reserve(self, tokens=0, exclude=None):
+        """
+        Pick the key that can send soonest and reserve a slot on its limiter
+
+        Args:
+            tokens: Estimated tokens for the request (see RateLimiter.reserve)
+            exclude: Key, or collection of keys, to avoid if any other is usable
+                     (e.g. the ones a request already failed on)
+
+        Returns:
+            (PooledKey, seconds to wait)
+        """
+        if not self.keys:
+            raise ValueError('No API keys configured')
+        with self._lock:
+            best = min(self._candidates(exclude), key=lambda k: k.limiter.peek(tokens))
+            wait = best.limiter.reserve(tokens)
+            benched_for = best.benched_until - self._clock()
+            return best, max(wait, benched_for)
+
+    async def acquire_async(self, tokens=0, exclude=None):
+        """Reserve on the best key and await its slot; returns (PooledKey, waited seconds)"""
+        key, wait = self.reserve(tokens, exclude)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return key, wait
+
+    def report(self, key, status, retry_after=None, sent_at=None):
+        """
+        Update a key's health from the HTTP status of a request sent with it
+
+        Args:
+            key: The PooledKey the request was sent with
+            status: HTTP status code of the response
+            retry_after: Seconds from the Retry-After header (429 only)
+            sent_at: Clock time the request was sent; a failure of a request sent
+                     before the key's last counted failure was reported overlapped
+                     it, so it does not count as another consecutive failure
+        """
+        with self._lock:
+            key.last_status = status
+            if status in (401, 403, 429):
+                now = self._clock()
+                if sent_at is None or key.last_failure_at is None or sent_at >= key.last_failure_at:
+                    key.failures += 1
+                    key.last_failure_at = now
+                if status == 429 and retry_after:
+                    # Only this key's quota is exhausted; others keep serving
+                    key.limiter.block_for(retry_after)
+                if key.failures >= self.bench_after:
+                    if status == 429:
+                        seconds = retry_after or self.bench_seconds
+                    else:
+                        seconds = self.auth_bench_seconds
+                    if key.benched_until <= now:
+                        print(f"🔑 Setting API key {key.label} aside for {seconds:.0f}s after repeated {status}s")
+                    key.benched_until = max(key.benched_until, now + seconds)
+            elif status < 400:
+                key.failures = 0
+
+    def status(self):
+        """Combined limiter status across usable keys, plus per-key detail under 'keys'"""
+        now = self._clock()
+        per_key = []
+        combined = {'requests_last_minute': 0, 'remaining_in_minute': 0, 'seconds_until_next_available': None}
+        for k in self.keys:
+            limiter_status = k.limiter.status()
+            benched = max(0.0, k.benched_until - now)
+            per_key.append(dict(limiter_status, key=k.label, benched_seconds=round(benched, 1),
+                                consecutive_failures=k.failures, last_status=k.last_status))
+            combined['requests_last_minute'] += limiter_status['requests_last_minute']
+            if benched:
+                continue
+            combined['remaining_in_minute'] += limiter_status['remaining_in_minute']
+            next_available = limiter_status['seconds_until_next_available']
+            soonest = combined['seconds_until_next_available']
+            if soonest is None or next_available < soonest:
+                combined['seconds_until_next_available'] = next_available
+            if 'tokens_remaining_in_minute' in limiter_status:
+                combined['tokens_per_minute_limit'] = (combined.get('tokens_per_minute_limit', 0)
+                                                       + limiter_status['tokens_per_minute_limit'])
+                combined['tokens_remaining_in_minute'] = (combined.get('tokens_remaining_in_minute', 0)
+                                                          + limiter_status['tokens_remaining_in_minute'])
+        if combined['seconds_until_next_available'] is None:
+            # Every key is benched: report when the first comes back
+            combined['seconds_until_next_available'] = min(
+                (max(0.0, k.benched_until - now) for k in self.keys), default=0.0)
+        combined['keys'] = per_key
+        return combined
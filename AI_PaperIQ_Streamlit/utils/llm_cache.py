@@ -0,0 +1,230 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheBackend:
+    """
+    Base class for LLM response caches.
+
+    Subclasses implement _get/_set/_clear/_size/_keys; hit and miss counting
+    lives here so every backend reports the same stats.
+    """
+
+    name = 'base'
+
+    def __init__(self, max_entries=1000, ttl_seconds=7 * 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for key, or None on miss/expiry"""
+        value = self._get(key)
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._set(key, value)
+
+    def clear(self):
+        self._clear()
+        with self._stats_lock:
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return self._size()
+
+    def keys(self, limit=5):
+        return self._keys(limit)
+
+    def stats(self):
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'backend': self.name,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 3) if total else 0.0,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+        }
+
+    def _expired(self, created_at, now):
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU cache with TTL (not shared between workers)"""
+
+    name = 'memory'
+
+    def __init__(self, max_entries=1000, ttl_seconds=7 * 24 * 3600):
+        super().__init__(max_entries, ttl_seconds)
+        self._data = OrderedDict()  # key -> (created_at, value)
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        now = time.time()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            created_at, value = item
+            if self._expired(created_at, now):
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def _set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def _clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def _size(self):
+        with self._lock:
+            return len(self._data)
+
+    def _keys(self, limit):
+        with self._lock:
+            return list(self._data.keys())[:limit]
+
+
+class SQLiteCache(CacheBackend):
+    """
+    SQLite-backed LRU cache with TTL.
+
+    The database file is shared by every process that points at the same path,
+    so Streamlit workers and restarts reuse each other's responses.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path, max_entries=1000, ttl_seconds=7 * 24 * 3600):
+        super().__init__(max_entries, ttl_seconds)
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+        conn.commit()
+
+    def _conn(self):
+        # sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _get(self, key):
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, created_at = row
+        if self._expired(created_at, now):
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            conn.commit()
+            return None
+        conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        conn.commit()
+        return value
+
+    def _set(self, key, value):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, created_at, last_access) "
+            "VALUES (?, ?, ?, ?)",
+            (key, value, now, now),
+        )
+        self._evict(conn, now)
+        conn.commit()
+
+    def _evict(self, conn, now):
+        if self.ttl_seconds is not None:
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        (count,) = conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def _clear(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM responses")
+        conn.commit()
+
+    def _size(self):
+        (count,) = self._conn().execute("SELECT COUNT(*) FROM responses").fetchone()
+        return count
+
+    def _keys(self, limit):
+        rows = self._conn().execute(
+            "SELECT key FROM responses ORDER BY last_access DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def stats(self):
+        info = super().stats()
+        info['path'] = self.path
+        return info
+
+
+def create_cache_from_env():
+    """
+    Build the cache backend selected by environment variables.
+
+    LLM_CACHE_BACKEND: 'sqlite' (default) or 'memory'
+    LLM_CACHE_PATH: SQLite file path (default: .cache/llm_cache.sqlite3 in the app folder)
+    LLM_CACHE_MAX_ENTRIES: size bound (default 1000)
+    LLM_CACHE_TTL_SECONDS: entry lifetime (default 7 days)
+    """
+    backend = os.getenv('LLM_CACHE_BACKEND', 'sqlite').lower()
+    max_entries = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '1000'))
+    ttl_seconds = float(os.getenv('LLM_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+
+    if backend == 'sqlite':
+        default_path = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'llm_cache.sqlite3'
+        )
+        path = os.getenv('LLM_CACHE_PATH', default_path)
+        try:
+            return SQLiteCache(path, max_entries=max_entries, ttl_seconds=ttl_seconds)
+        except (OSError, sqlite3.Error) as e:
+            print(f"⚠️ SQLite cache unavailable ({e}), falling back to in-memory cache")
+
+    return MemoryCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
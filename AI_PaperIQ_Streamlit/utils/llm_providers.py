@@ -0,0 +1,210 @@
+import time
+import threading
+from collections import deque
+
+from utils.deadline import DeadlineExceededError
+
+
+class ProviderUnavailableError(Exception):
+    """Raised when a provider is rate limited or overloaded (HTTP 429/503)"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMProvider:
+    """
+    Interface implemented by each LLM backend (Groq in llm_service, Gemini in paper_fetcher).
+
+    complete() returns the full completion text; stream() yields text deltas.
+    task ('chat' or 'summary') lets a provider pick a model for the workload.
+    Implementations raise ProviderUnavailableError on 429/503 (and auth
+    failures) so the router cools the provider down and fails over; any other
+    Exception also fails over, without a cooldown.
+    """
+
+    name = 'provider'
+
+    @property
+    def available(self):
+        """False when the provider is not configured (e.g. missing API key)"""
+        return True
+
+    def choose_model(self, preferred='auto', task='summary', prompt=''):
+        raise NotImplementedError
+
+    async def complete(self, prompt, preferred='auto', max_tokens=2048, temperature=0.7, fail_fast=False,
+                       task='summary'):
+        raise NotImplementedError
+
+    async def stream(self, prompt, preferred='auto', max_tokens=2048, temperature=0.7, fail_fast=False,
+                     task='summary'):
+        # Providers without native streaming yield the whole completion at once
+        yield await self.complete(prompt, preferred, max_tokens, temperature, fail_fast, task)
+
+
+class ProviderStats:
+    """Rolling latency and error-rate window for one provider"""
+
+    def __init__(self, window=50, default_cooldown=30.0):
+        self.default_cooldown = default_cooldown
+        self._samples = deque(maxlen=window)  # (latency_seconds, ok)
+        self._cooldown_until = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency, ok):
+        with self._lock:
+            self._samples.append((latency, ok))
+
+    def cool_down(self, seconds=None):
+        """Take the provider out of rotation after a 429/503"""
+        with self._lock:
+            until = time.monotonic() + (seconds or self.default_cooldown)
+            self._cooldown_until = max(self._cooldown_until, until)
+
+    @property
+    def cooling_down(self):
+        return time.monotonic() < self._cooldown_until
+
+    def snapshot(self):
+        with self._lock:
+            samples = list(self._samples)
+            cooldown_left = max(0.0, self._cooldown_until - time.monotonic())
+        latencies = sorted(latency for latency, ok in samples if ok)
+        errors = sum(1 for _, ok in samples if not ok)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        return {
+            'requests': len(samples),
+            'p50_latency': percentile(0.50),
+            'p95_latency': percentile(0.95),
+            'error_rate': round(errors / len(samples), 3) if samples else 0.0,
+            'cooldown_seconds': round(cooldown_left, 1),
+        }
+
+    def score(self):
+        """
+        Lower is healthier: typical latency inflated by the recent error rate
+
+        Returns None for an untried provider, and infinity when every recent
+        request failed (there is no latency to weigh the errors against).
+        """
+        snap = self.snapshot()
+        if snap['p50_latency'] is None:
+            return None if snap['requests'] == 0 else float('inf')
+        typical = (snap['p50_latency'] + snap['p95_latency']) / 2
+        return typical * (1 + 4 * snap['error_rate'])
+
+
+class LLMRouter:
+    """
+    Sends each request to the healthiest provider and fails over on errors.
+
+    Providers are ranked by ProviderStats.score(); ties keep configuration
+    order, so the first provider acts as the primary. Untried providers score
+    as well as the best provider with a finite score, so they rank behind
+    earlier providers in configuration order instead of jumping ahead. A
+    provider that returns 429/503 is cooled down (honouring Retry-After) and
+    skipped until it recovers, unless every provider is cooling down; any
+    other error (except the caller's deadline) moves on to the next provider.
+    """
+
+    def __init__(self, providers):
+        self.providers = [p for p in providers if p.available]
+        if not self.providers:
+            raise ValueError('No LLM provider is configured')
+        self.stats = {p.name: ProviderStats() for p in self.providers}
+
+    def rank(self):
+        ready = [p for p in self.providers if not self.stats[p.name].cooling_down]
+        # When everything is cooling down, try anyway rather than failing outright
+        candidates = ready or list(self.providers)
+        scores = {p.name: self.stats[p.name].score() for p in candidates}
+        known = [score for score in scores.values() if score is not None and score != float('inf')]
+        untried = min(known) if known else 0.0
+        return sorted(candidates, key=lambda p: untried if scores[p.name] is None else scores[p.name])
+
+    def get_provider(self, name):
+        for provider in self.providers:
+            if provider.name == name:
+                return provider
+        raise ValueError(f"Unknown or unconfigured LLM provider: {name}")
+
+    async def complete(self, prompt, preferred='auto', max_tokens=2048, temperature=0.7, task='summary'):
+        """Complete prompt on the best provider, failing over when one fails"""
+        candidates = self.rank()
+        last_error = None
+        for i, provider in enumerate(candidates):
+            # Skip long backoff loops while another provider could take the request
+            fail_fast = i < len(candidates) - 1
+            stats = self.stats[provider.name]
+            start = time.monotonic()
+            try:
+                text = await provider.complete(prompt, preferred, max_tokens, temperature, fail_fast, task)
+            except ProviderUnavailableError as e:
+                stats.record(time.monotonic() - start, ok=False)
+                stats.cool_down(e.retry_after)
+                last_error = e
+                if fail_fast:
+                    print(f"↪ {provider.name} unavailable, failing over to {candidates[i + 1].name}")
+                continue
+            except DeadlineExceededError:
+                raise  # the caller's budget ran out; says nothing about the provider's health
+            except Exception as e:
+                stats.record(time.monotonic() - start, ok=False)
+                last_error = e
+                if fail_fast:
+                    print(f"↪ {provider.name} failed ({e}), failing over to {candidates[i + 1].name}")
+                continue
+            stats.record(time.monotonic() - start, ok=True)
+            return text
+        raise last_error
+
+    async def stream(self, prompt, preferred='auto', max_tokens=2048, temperature=0.7, task='summary'):
+        """Stream from the best provider; failover is only possible before the first token"""
+        candidates = self.rank()
+        last_error = None
+        for i, provider in enumerate(candidates):
+            fail_fast = i < len(candidates) - 1
+            stats = self.stats[provider.name]
+            start = time.monotonic()
+            produced = False
+            try:
+                async for delta in provider.stream(prompt, preferred, max_tokens, temperature, fail_fast, task):
+                    produced = True
+                    yield delta
+            except ProviderUnavailableError as e:
+                stats.record(time.monotonic() - start, ok=False)
+                stats.cool_down(e.retry_after)
+                if produced:
+                    raise
+                last_error = e
+                if fail_fast:
+                    print(f"↪ {provider.name} unavailable, failing over to {candidates[i + 1].name}")
+                continue
+            except DeadlineExceededError:
+                raise  # the caller's budget ran out; says nothing about the provider's health
+            except Exception as e:
+                stats.record(time.monotonic() - start, ok=False)
+                if produced:
+                    raise
+                last_error = e
+                if fail_fast:
+                    print(f"↪ {provider.name} failed ({e}), failing over to {candidates[i + 1].name}")
+                continue
+            stats.record(time.monotonic() - start, ok=True)
+            return
+        raise last_error
+
+    def status(self):
+        """Per-provider rolling latency/error stats, in current routing order"""
+        ranked = self.rank()
+        return [
+            dict(self.stats[p.name].snapshot(), provider=p.name, rank=ranked.index(p) + 1 if p in ranked else None)
+            for p in self.providers
+        ]
@@ -1,10 +1,29 @@
 import os
 from dotenv import load_dotenv
-import requests
+import asyncio
+import concurrent.futures
+import threading
+import httpx
 import json
 import time
 import random
-from datetime import datetime, timedelta
+import hashlib
+from contextlib import contextmanager
+
+from utils import http_client, paper_fetcher
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from utils import deadline as deadlines
+from utils.deadline import DeadlineExceededError, deadline_scope, within_deadline
+from utils.hedging import create_policy_from_env, race, race_streams
+from utils.key_pool import KeyPool, load_keys
+from utils.llm_cache import create_cache_from_env
+from utils.model_policy import ModelPolicy
+from utils.semantic_cache import create_index_from_env
+from utils.telemetry import get_telemetry, start_metrics_server
+from utils.tokens import CHARS_PER_TOKEN, estimate_tokens
+from utils.llm_providers import LLMProvider, LLMRouter, ProviderUnavailableError
+from utils.rate_limiter import RateLimiter
+from utils.scheduler import BACKGROUND, INTERACTIVE, create_scheduler_from_env, current_priority, request_priority
 
 try:
     import streamlit as st
@@ -13,145 +32,469 @@ except Exception:
 
 load_dotenv()
 
-API_KEY = os.getenv('GROQ_API_KEY')
-if not API_KEY and st is not None:
-    try:
-        API_KEY = st.secrets.get('GROQ_API_KEY', None)
-    except Exception:
-        API_KEY = None
+# GROQ_API_KEYS (comma separated) and/or GROQ_API_KEY, from env or Streamlit secrets
+_API_KEYS = load_keys('GROQ_API_KEY', st.secrets if st is not None else None)
+API_KEY = _API_KEYS[0] if _API_KEYS else None
 
-if not API_KEY:
-    raise ValueError('Please set GROQ_API_KEY in .env or Streamlit secrets')
+# Groq is the primary provider; Gemini (GOOGLE_API_KEY) can stand in for it
+if not API_KEY and not paper_fetcher.API_KEY:
+    raise ValueError('Please set GROQ_API_KEY (or GOOGLE_API_KEY) in .env or Streamlit secrets')
 
-# Global rate limiting tracker and cache
-_last_request_time = None
-_request_count = 0
-_request_times = []
+# Per-key rate limiters and global cache
 _MIN_REQUEST_INTERVAL = 1  # Groq is faster, 1 second between requests
 _MAX_REQUESTS_PER_MINUTE = 30  # Groq free tier limit
-_response_cache = {}  # Cache API responses to avoid duplicate calls
+# Groq free tier TPM; refined at runtime from x-ratelimit-limit-tokens headers
+_MAX_TOKENS_PER_MINUTE = int(os.getenv('GROQ_TOKENS_PER_MINUTE', '6000'))
+# Each key has its own RPM/TPM limiter; requests go to the key with the most budget
+_key_pool = KeyPool(_API_KEYS, lambda: RateLimiter(_MAX_REQUESTS_PER_MINUTE, _MIN_REQUEST_INTERVAL,
+                                                   _MAX_TOKENS_PER_MINUTE))
+# Priority admission ahead of the key pool: queued requests are released in
+# priority order as rate-limit slots free up, so chat overtakes batch summaries.
+_scheduler = create_scheduler_from_env(ready_after=_key_pool.peek)
 
-def _check_rate_limit():
-    """
-    Check and enforce rate limiting before making requests.
-    Returns: (allowed: bool, wait_time: float)
+# Circuit breaker around the Groq endpoint: while open, calls fail fast with
+# CircuitOpenError (a ProviderUnavailableError) so the router falls back to Gemini
+_groq_breaker = CircuitBreaker(
+    'groq',
+    failure_rate_threshold=float(os.getenv('GROQ_CIRCUIT_FAILURE_RATE', '0.5')),
+    slow_call_seconds=float(os.getenv('GROQ_CIRCUIT_SLOW_CALL_SECONDS', '30')),
+    open_seconds=float(os.getenv('GROQ_CIRCUIT_OPEN_SECONDS', '30')),
+)
+
+# Optional hedged requests for tail latency (GROQ_HEDGE_* env vars, configure_hedging)
+_hedge_policy = create_policy_from_env()
+
+# Per-call metrics (model, tokens, queue wait, latency, retries, status codes, cache outcome)
+_telemetry = get_telemetry()
+start_metrics_server()  # only when LLM_METRICS_PORT is set
+_model_policy = ModelPolicy()  # Input-size and latency aware choice for 'auto'
+_response_cache = create_cache_from_env()  # Persistent LRU/TTL cache of API responses
+_near_duplicates = create_index_from_env()  # Second tier: near-duplicate inputs -> summaries
+_inflight = {}  # cache key -> Future of the request currently fetching it
+_inflight_lock = threading.Lock()
+
+# Bump when prompt templates change so stale cached answers are not served
+PROMPT_TEMPLATE_VERSION = 1
+
+def set_cache_backend(backend):
+    """Swap the response cache for another CacheBackend (e.g. MemoryCache)"""
+    global _response_cache
+    _response_cache = backend
+
+def _make_cache_key(model_name, prompt, max_tokens, temperature):
+    """Cache key covering every parameter that changes the completion"""
+    raw = json.dumps([PROMPT_TEMPLATE_VERSION, model_name, max_tokens, temperature, prompt])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def _usage(payload):
+    """Usage block from a completion body or final stream event ({} if not reported)"""
+    return payload.get('usage') or (payload.get('x_groq') or {}).get('usage') or {}
+
+def _usage_total_tokens(payload):
+    """Total tokens from a completion body or final stream event, if reported"""
+    return _usage(payload).get('total_tokens')
+
+def choose_best_model(preferred='auto', task='summary', prompt_tokens=0, target_latency=None):
     """
-    global _last_request_time, _request_count, _request_times
-    
-    current_time = datetime.now()
-    
-    # Clean up old request times (older than 1 minute)
-    _request_times = [t for t in _request_times if current_time - t < timedelta(minutes=1)]
+    Choose model based on preference - using Groq API
     
-    # Check if we've hit the per-minute limit
-    if len(_request_times) >= _MAX_REQUESTS_PER_MINUTE:
-        oldest_request = min(_request_times)
-        wait_until = oldest_request + timedelta(minutes=1)
-        wait_seconds = (wait_until - current_time).total_seconds()
-        if wait_seconds > 0:
-            return False, wait_seconds
+    'pro' and 'flash' pin a model; 'auto' asks the model policy, which routes
+    short inputs to the fast model and escalates to the large one when needed.
     
-    # Check minimum interval between requests
-    if _last_request_time:
-        time_since_last = (current_time - _last_request_time).total_seconds()
-        if time_since_last < _MIN_REQUEST_INTERVAL:
-            return False, _MIN_REQUEST_INTERVAL - time_since_last
-    
-    return True, 0
-
-def _record_request():
-    """Record that a request was made"""
-    global _last_request_time, _request_times
-    _last_request_time = datetime.now()
-    _request_times.append(datetime.now())
-
-def choose_best_model(preferred='auto'):
-    """Choose model based on preference - using Groq API"""
+    Args:
+        preferred: 'auto', 'pro' or 'flash'
+        task: 'chat' or 'summary'
+        prompt_tokens: Estimated prompt size
+        target_latency: Latency goal in seconds (defaults to the task's target)
+    """
     # Using current active Groq models (updated Dec 2024)
     if preferred == 'pro':
         return 'llama-3.3-70b-versatile'  # Most capable model
     elif preferred == 'flash':
         return 'llama-3.1-8b-instant'  # Fastest model
-    else:  # auto - prefer the best available
-        return 'llama-3.3-70b-versatile'  # Default to most capable
+    else:  # auto - let the policy decide from input size, task and live latency
+        return _model_policy.choose(task, prompt_tokens, target_latency)
+
+def configure_model_policy(**overrides):
+    """Tune the 'auto' policy, e.g. configure_model_policy(small_max_tokens={'summary': 3000})"""
+    _model_policy.configure(**overrides)
+
+def get_model_policy_status():
+    """Recent 'auto' model decisions and the live latency stats behind them"""
+    return {
+        'config': _model_policy.config,
+        'latency': _model_policy.latency_summary(),
+        'recent_decisions': _model_policy.recent_decisions(),
+    }
+
+# GROQ_API_BASE can point at a local stub (benchmarks/stub_llm_server.py) for load tests
+_GROQ_API_BASE = os.getenv('GROQ_API_BASE', 'https://api.groq.com/openai/v1').rstrip('/')
+_GROQ_CHAT_URL = f"{_GROQ_API_BASE}/chat/completions"
+
+def _groq_headers(api_key=None):
+    return {
+        'Content-Type': 'application/json',
+        'Authorization': f'Bearer {api_key or API_KEY}'
+    }
+
+def _build_chat_payload(model_name, prompt, max_tokens, temperature, stream=False):
+    payload = {
+        "model": model_name,
+        "messages": [
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "top_p": 0.95,
+    }
+    if stream:
+        payload["stream"] = True
+    return payload
 
-def make_groq_request(model_name, prompt, max_tokens=2048, use_cache=True):
+def _check_keys_usable(fail_fast=False):
     """
-    Centralized function to make Groq API requests with retry logic and rate limiting
+    Fail at once when waiting for a key is pointless
+    
+    With every key set aside, a request that has another provider to fail over
+    to (fail_fast) should do so; otherwise it waits for the first key to come
+    back like any other rate-limit wait. Keys set aside after 401/403s will not
+    start working by waiting, so that always fails.
+    
+    Raises:
+        ProviderUnavailableError: as described above
+    """
+    benched = _key_pool.benched_seconds()
+    if not benched:
+        return
+    if _key_pool.rejected():
+        raise _auth_error(_key_pool.keys[0].last_status)
+    if fail_fast:
+        raise ProviderUnavailableError(
+            "🔑 Every Groq API key is set aside after repeated rate limits.", retry_after=benched)
+
+async def _wait_for_rate_limit(tokens=0, exclude=None, fail_fast=False):
+    """
+    Wait (without blocking the event loop) for this request's rate-limit slot
+    
+    Returns:
+        (PooledKey to send with, seconds waited)
+    
+    Raises:
+        ProviderUnavailableError: when every key is set aside (see _check_keys_usable)
+        DeadlineExceededError: if the wait would outlast the deadline
+    """
+    _check_keys_usable(fail_fast)
+    key, wait_time = _key_pool.reserve(tokens, exclude=exclude)
+    if wait_time > 0:
+        try:
+            deadlines.ensure_time_for(wait_time, 'Groq request')
+        except DeadlineExceededError:
+            key.limiter.settle(tokens, 0)  # give back the token estimate; the request is not sent
+            raise
+        await asyncio.sleep(wait_time)
+        print(f"⏳ Rate limit: waited {wait_time:.1f} seconds before request...")
+    return key, wait_time
+
+async def _switch_key(key, reserved_tokens, exclude=None, fail_fast=False):
+    """Refund a rejected request's token estimate and re-queue it on the best other key"""
+    key.limiter.settle(reserved_tokens, 0)
+    return await _wait_for_rate_limit(reserved_tokens, exclude=exclude or key, fail_fast=fail_fast)
+
+def _auth_error(status):
+    """Every usable key was rejected: the router should fail over rather than surface it"""
+    return ProviderUnavailableError(
+        f"🔑 Groq rejected the API key (status {status}). Check GROQ_API_KEY / GROQ_API_KEYS."
+    )
+
+def _retry_after_seconds(response, attempt, base_delay):
+    """Honour Retry-After when present, otherwise exponential backoff with jitter"""
+    retry_after = response.headers.get('Retry-After')
+    if retry_after:
+        try:
+            return int(retry_after)
+        except ValueError:
+            pass
+    return base_delay * (2 ** attempt) + random.uniform(0, 2)
+
+class _LeaderCancelledError(Exception):
+    """Handed to coalesced followers when the request they joined was cancelled or ran out of its
+    own caller's deadline"""
+
+async def make_groq_request_async(model_name, prompt, max_tokens=2048, use_cache=True, temperature=0.7,
+                                  timeout=60, max_retries=3, deadline=None, fail_fast=False):
+    """
+    Async Groq chat completion with caching, rate limiting and retries
+    
+    Requests go through the shared keep-alive pool in utils.http_client.
+    Identical requests already in flight are coalesced: later callers wait for
+    the first caller's result (or error) instead of sending a duplicate.
     
     Args:
         model_name: The Groq model to use
         prompt: The prompt text
         max_tokens: Maximum tokens in response
         use_cache: If True, return cached response for identical requests
+        temperature: Sampling temperature
+        timeout: Per-attempt timeout in seconds
+        max_retries: Retries on 429/503/network errors before giving up
+        deadline: Seconds the whole call may take. Attempt timeouts, rate-limit
+                  waits and backoff are clipped to the time left, and retrying
+                  stops as soon as the deadline cannot be met.
+        fail_fast: Another provider can take over, so give up rather than wait
+                   when every key is set aside
+    
+    Raises:
+        ProviderUnavailableError: if still rate limited after max_retries
+        DeadlineExceededError: if no answer can arrive within deadline
     """
-    # Generate cache key
-    import hashlib
-    cache_key = hashlib.md5(f"{model_name}:{prompt}".encode()).hexdigest()
+    if deadline is not None:
+        with deadline_scope(deadline):
+            return await make_groq_request_async(model_name, prompt, max_tokens, use_cache, temperature, timeout,
+                                                 max_retries, fail_fast=fail_fast)
+    started = time.monotonic()
+    if not use_cache:
+        response_text, _ = await _send_hedged_request(model_name, prompt, max_tokens, temperature, timeout,
+                                                      max_retries, fail_fast)
+        return response_text
+    
+    cache_key = _make_cache_key(model_name, prompt, max_tokens, temperature)
     
     # Check cache first
-    if use_cache and cache_key in _response_cache:
+    cached = _response_cache.get(cache_key)
+    if cached is not None:
         print("✓ Using cached response")
-        return _response_cache[cache_key]
+        _telemetry.record_call('groq', model_name, cache='hit', duration=time.monotonic() - started)
+        return cached
     
-    # Check rate limit before making request
-    allowed, wait_time = _check_rate_limit()
-    if not allowed:
-        print(f"⏳ Rate limit: waiting {wait_time:.1f} seconds before request...")
-        time.sleep(wait_time)
+    # Single-flight: the first caller for a key does the work, others share it.
+    # concurrent.futures.Future works across threads and event loops alike.
+    with _inflight_lock:
+        leader = _inflight.get(cache_key)
+        if leader is None:
+            future = concurrent.futures.Future()
+            _inflight[cache_key] = future
+    if leader is not None:
+        print("✓ Joining identical in-flight request")
+        status = 'error'
+        try:
+            # shield: a follower giving up at its deadline must not cancel the leader's future
+            response_text = await within_deadline(asyncio.shield(asyncio.wrap_future(leader)), 'Groq request')
+            status = 'ok'
+            return response_text
+        except _LeaderCancelledError:
+            status = 'cancelled'
+        finally:
+            _telemetry.record_call('groq', model_name, cache='coalesced', status=status,
+                                   duration=time.monotonic() - started)
+        # The leader was cancelled or timed out, not this caller: send the request ourselves (or join a new leader)
+        return await make_groq_request_async(model_name, prompt, max_tokens, use_cache, temperature, timeout,
+                                             max_retries, fail_fast=fail_fast)
     
-    # Record this request
-    _record_request()
+    def finish():
+        # Unregister before waking followers, so none can join a finished future
+        with _inflight_lock:
+            _inflight.pop(cache_key, None)
     
-    url = "https://api.groq.com/openai/v1/chat/completions"
+    try:
+        response_text, answered_by = await _send_hedged_request(model_name, prompt, max_tokens, temperature,
+                                                                timeout, max_retries, fail_fast)
+        # Cache the response before releasing waiters, under the model that actually answered
+        _response_cache.set(_make_cache_key(answered_by, prompt, max_tokens, temperature), response_text)
+    except (asyncio.CancelledError, concurrent.futures.CancelledError, DeadlineExceededError):
+        # Cancellation and deadlines belong to this caller: followers retry under their own
+        finish()
+        future.set_exception(_LeaderCancelledError())
+        raise
+    except BaseException as e:
+        finish()
+        future.set_exception(e)
+        raise
+    finish()
+    future.set_result(response_text)
+    return response_text
+
+def _start_hedge(model_name):
+    """Take a hedge from the budget; returns the backup model, or None if no hedge may be sent"""
+    if get_rate_limit_status()['remaining_in_minute'] <= 0:
+        return None
+    if not _hedge_policy.try_acquire(_MAX_REQUESTS_PER_MINUTE * max(1, len(_key_pool))):
+        return None
+    backup_model = _hedge_policy.backup_for(model_name)
+    print(f"🪂 Hedging slow {model_name} request with {backup_model}")
+    return backup_model
+
+async def _send_hedged_request(model_name, prompt, max_tokens, temperature, timeout, max_retries=3,
+                               fail_fast=False):
+    """
+    Send a chat completion, hedging it when enabled
     
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': f'Bearer {API_KEY}'
-    }
+    If the primary request has not answered within the hedge deadline (the
+    configured percentile of recent latencies for the model) of being sent, a
+    backup request is sent and whichever succeeds first wins; the other is cancelled.
+    Time queued for the scheduler or a rate-limit slot does not count, since
+    the latency samples do not include it either.
     
-    payload = {
-        "model": model_name,
-        "messages": [
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        "temperature": 0.7,
-        "max_tokens": max_tokens,
-        "top_p": 0.95,
-    }
+    Returns:
+        (response_text, model_that_answered)
+    """
+    deadline = _hedge_policy.deadline('response', model_name) if _hedge_policy.enabled else None
+    if deadline is None:
+        return await _send_groq_request(model_name, prompt, max_tokens, temperature, timeout, max_retries,
+                                        fail_fast), model_name
+    
+    sent = asyncio.Event()
+    primary = _send_groq_request(model_name, prompt, max_tokens, temperature, timeout, max_retries, fail_fast,
+                                 sent)
+    
+    backup_model = None
+    
+    def start_backup():
+        nonlocal backup_model
+        backup_model = _start_hedge(model_name)
+        if backup_model is None:
+            return None
+        return _send_groq_request(backup_model, prompt, max_tokens, temperature, timeout, max_retries, fail_fast)
+    
+    response_text, won_by_backup = await race(primary, start_backup, deadline, started=sent)
+    _hedge_policy.record_win(won_by_backup)
+    return response_text, backup_model if won_by_backup else model_name
+
+def _new_call_stats():
+    """Per-call telemetry filled in by the request loops"""
+    return {'queue_wait': 0.0, 'latency': None, 'retries': 0, 'status_codes': [],
+            'prompt_tokens': 0, 'completion_tokens': 0, 'priority': current_priority()}
+
+def _call_status(error):
+    """Telemetry status label for how a call ended"""
+    if error is None:
+        return 'ok'
+    if isinstance(error, DeadlineExceededError):
+        return 'deadline_exceeded'
+    if isinstance(error, CircuitOpenError):
+        return 'circuit_open'
+    if isinstance(error, ProviderUnavailableError):
+        return 'rate_limited'
+    if isinstance(error, (asyncio.CancelledError, GeneratorExit)):
+        return 'cancelled'  # e.g. the losing side of a hedged request, or an abandoned stream
+    return 'error'
+
+async def _send_groq_request(model_name, prompt, max_tokens, temperature, timeout, max_retries=3,
+                             fail_fast=False, sent=None):
+    """
+    Send one chat completion through the Groq circuit breaker and return its text
+    
+    sent, if given, is an asyncio.Event set once the request leaves the rate-limit queue
+    """
+    started = time.monotonic()
+    call = _new_call_stats()
+    error = None
+    is_probe = False
+    priority = None
+    try:
+        _check_keys_usable(fail_fast)
+        call['queue_wait'] = await within_deadline(
+            _scheduler.acquire(tokens=estimate_tokens(prompt) + max_tokens), 'Groq request')
+        priority = current_priority()
+        is_probe = _groq_breaker.before_call()
+        return await _send_groq_attempts(model_name, prompt, max_tokens, temperature, timeout, max_retries, call,
+                                         fail_fast, sent)
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        if priority is not None:
+            _scheduler.release(priority)
+        if is_probe:
+            _groq_breaker.release_probe()
+        _telemetry.record_call('groq', model_name, status=_call_status(error),
+                               duration=time.monotonic() - started, **call)
+
+def _record_groq_failure(sent_at):
+    """Count a failed attempt against the breaker; stop retrying once it opens"""
+    _groq_breaker.record_failure(time.monotonic() - sent_at)
+    _groq_breaker.raise_if_open()
+
+async def _send_groq_attempts(model_name, prompt, max_tokens, temperature, timeout, max_retries=3, call=None,
+                              fail_fast=False, sent=None):
+    """Send one chat completion (rate limited, with retries) and return its text"""
+    call = call if call is not None else _new_call_stats()
+    # Budget both requests and tokens (prompt estimate + worst-case completion)
+    reserved_tokens = estimate_tokens(prompt) + max_tokens
+    key, wait = await _wait_for_rate_limit(reserved_tokens, fail_fast=fail_fast)
+    call['queue_wait'] += wait
+    if sent is not None:
+        sent.set()
+    
+    url = _GROQ_CHAT_URL
+    payload = _build_chat_payload(model_name, prompt, max_tokens, temperature)
     
-    max_retries = 3
     base_delay = 2  # Base delay for retries
+    tried = {key}  # keys this request was sent with; moving to an untried key is not a retry
+    attempt = 0
     
-    for attempt in range(max_retries + 1):
+    while True:
+        call['retries'] = attempt + len(tried) - 1
         try:
-            response = requests.post(url, headers=headers, json=payload, timeout=60)
+            sent_at = time.monotonic()
+            # httpx applies the timeout per phase; within_deadline bounds the attempt as a whole
+            response = await within_deadline(
+                http_client.arequest('POST', url, headers=_groq_headers(key.key), json=payload,
+                                     timeout=deadlines.clip_timeout(timeout, 'Groq request')),
+                'Groq request',
+            )
             status = response.status_code
+            call['latency'] = time.monotonic() - sent_at
+            call['status_codes'].append(status)
+            key.limiter.observe_headers(response.headers)
+            if status != 429:
+                _key_pool.report(key, status, sent_at=sent_at)
+            
+            if status in (401, 403):
+                # Rejected key: go straight on to a usable key not tried yet
+                if not _key_pool.has_fresh_key(exclude=tried, tokens=reserved_tokens):
+                    raise _auth_error(status)
+                key, _ = await _switch_key(key, reserved_tokens, exclude=tried, fail_fast=fail_fast)
+                tried.add(key)
+                continue
             
             # Handle rate limiting
             if status in (429, 503):
+                if status == 503:
+                    # Overload counts against endpoint health; 429 is just our quota
+                    _record_groq_failure(sent_at)
+                sleep_s = _retry_after_seconds(response, attempt, base_delay)
+                if status == 429:
+                    # Only this key's quota is spent; its limiter holds back its queue
+                    _key_pool.report(key, status, retry_after=sleep_s, sent_at=sent_at)
+                    if _key_pool.has_fresh_key(exclude=tried, tokens=reserved_tokens):
+                        print("⏳ Rate limited. Retrying on another key...")
+                        key, _ = await _switch_key(key, reserved_tokens, exclude=tried, fail_fast=fail_fast)
+                        tried.add(key)
+                        continue
+                else:
+                    key.limiter.block_for(sleep_s)
                 if attempt == max_retries:
-                    raise Exception(f"⚠️ Rate limit exceeded. Your API quota may be exhausted.\n\n"
-                                    f"Solutions:\n"
-                                    f"1. Wait 60 seconds and try again\n"
-                                    f"2. Check your quota at: https://console.groq.com/\n"
-                                    f"3. Consider upgrading for higher limits")
+                    raise ProviderUnavailableError(
+                        f"⚠️ Rate limit exceeded. Your API quota may be exhausted.\n\n"
+                        f"Solutions:\n"
+                        f"1. Wait 60 seconds and try again\n"
+                        f"2. Check your quota at: https://console.groq.com/\n"
+                        f"3. Consider upgrading for higher limits",
+                        retry_after=sleep_s,
+                    )
                 
-                # Calculate exponential backoff with jitter
-                retry_after = response.headers.get('Retry-After')
-                if retry_after:
-                    try:
-                        sleep_s = int(retry_after)
-                    except ValueError:
-                        sleep_s = base_delay * (2 ** attempt) + random.uniform(0, 2)
+                if status == 429:
+                    # Resume on whichever key frees up first (with one key: after Retry-After)
+                    print(f"⏳ Rate limited. Retrying on the next available key... (Attempt {attempt + 1}/{max_retries})")
+                    key, _ = await _switch_key(key, reserved_tokens, fail_fast=fail_fast)
                 else:
-                    sleep_s = base_delay * (2 ** attempt) + random.uniform(0, 2)
-                
-                print(f"⏳ Rate limited. Waiting {sleep_s:.1f} seconds... (Attempt {attempt + 1}/{max_retries})")
-                time.sleep(sleep_s)
+                    deadlines.ensure_time_for(sleep_s, 'Groq request')
+                    print(f"⏳ Rate limited. Waiting {sleep_s:.1f} seconds... (Attempt {attempt + 1}/{max_retries})")
+                    await asyncio.sleep(sleep_s)
+                attempt += 1
                 continue
             
             # Raise for other HTTP errors
@@ -159,18 +502,23 @@ def make_groq_request(model_name, prompt, max_tokens=2048, use_cache=True):
             
             result = response.json()
             
+            usage = _usage(result)
+            call['prompt_tokens'] = usage.get('prompt_tokens', 0)
+            call['completion_tokens'] = usage.get('completion_tokens', 0)
+            actual_tokens = usage.get('total_tokens')
+            if actual_tokens:
+                key.limiter.settle(reserved_tokens, actual_tokens)
+            
             # Extract response text (OpenAI-compatible format)
             if 'choices' in result and len(result['choices']) > 0:
                 choice = result['choices'][0]
                 
                 if 'message' in choice and 'content' in choice['message']:
-                    response_text = choice['message']['content'].strip()
-                    
-                    # Cache the response
-                    if use_cache:
-                        _response_cache[cache_key] = response_text
-                    
-                    return response_text
+                    latency = time.monotonic() - sent_at
+                    _model_policy.record_latency(model_name, latency)
+                    _hedge_policy.record('response', model_name, latency)
+                    _groq_breaker.record_success(latency)
+                    return choice['message']['content'].strip()
                 
                 # Handle different finish reasons
                 finish_reason = choice.get('finish_reason', '')
@@ -187,18 +535,27 @@ def make_groq_request(model_name, prompt, max_tokens=2048, use_cache=True):
             # Unexpected format
             raise Exception(f"Unexpected response format. Response: {json.dumps(result)[:200]}")
         
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
+            call['status_codes'].append('timeout')
+            # A timeout cut short by the caller's deadline says nothing about endpoint health
+            deadlines.check('Groq request')
+            _record_groq_failure(sent_at)
             if attempt == max_retries:
                 raise Exception("Request timed out after multiple attempts.")
             sleep_s = base_delay * (2 ** attempt) + random.uniform(0, 1)
+            deadlines.ensure_time_for(sleep_s, 'Groq request')
             print(f"Timeout. Retrying in {sleep_s:.2f} seconds...")
-            time.sleep(sleep_s)
+            await asyncio.sleep(sleep_s)
+            attempt += 1
         
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
+            # Client errors (4xx) say nothing about endpoint health
+            if not isinstance(e, httpx.HTTPStatusError) or e.response.status_code >= 500:
+                _record_groq_failure(sent_at)
             if attempt == max_retries:
                 status_info = ''
                 try:
-                    if hasattr(e, 'response') and e.response is not None:
+                    if isinstance(e, httpx.HTTPStatusError):
                         status_info = f" (status {e.response.status_code})"
                         # Try to get error details from response
                         try:
@@ -212,19 +569,372 @@ def make_groq_request(model_name, prompt, max_tokens=2048, use_cache=True):
                 raise Exception(f"API Request failed{status_info}")
             
             sleep_s = base_delay * (2 ** attempt) + random.uniform(0, 1)
+            deadlines.ensure_time_for(sleep_s, 'Groq request')
             print(f"Request failed. Retrying in {sleep_s:.2f} seconds...")
-            time.sleep(sleep_s)
+            await asyncio.sleep(sleep_s)
+            attempt += 1
 
-def summarize_text(text, preferred='auto'):
-    """Use Groq API to summarize text"""
-    model_name = choose_best_model(preferred)
+def make_groq_request(model_name, prompt, max_tokens=2048, use_cache=True, temperature=0.7, timeout=60,
+                      deadline=None):
+    """
+    Centralized function to make Groq API requests with retry logic and rate limiting
     
-    # Truncate text if too long (approximate token limit)
-    max_chars = 30000  # Groq handles more tokens
-    if len(text) > max_chars:
-        text = text[:max_chars] + "\n\n[Content truncated due to length...]"
+    Synchronous wrapper around make_groq_request_async for Streamlit callers.
     
-    prompt = f"""You are an expert AI research summarizer. Summarize the following content clearly and concisely using the structure below:
+    Args:
+        model_name: The Groq model to use
+        prompt: The prompt text
+        max_tokens: Maximum tokens in response
+        use_cache: If True, return cached response for identical requests
+        temperature: Sampling temperature
+        timeout: Per-attempt timeout in seconds
+        deadline: Overall time budget in seconds (see make_groq_request_async)
+    """
+    return http_client.run_sync(
+        make_groq_request_async(model_name, prompt, max_tokens, use_cache, temperature, timeout, deadline=deadline)
+    )
+
+async def stream_groq_request_async(model_name, prompt, max_tokens=2048, use_cache=True, temperature=0.7,
+                                    timeout=60, max_retries=3, fail_fast=False):
+    """
+    Async streaming variant of make_groq_request_async
+    
+    Yields text deltas from the OpenAI-compatible SSE endpoint as they arrive.
+    Cached responses are yielded as a single chunk; the full text is cached once
+    the stream completes. Retries only happen before the first token is received.
+    Must be driven on the shared client loop (see stream_groq_request).
+    
+    With hedging enabled, a backup stream is started when no token has arrived
+    by the hedge deadline (counted from when the request was sent, not queued);
+    the first stream to produce a token wins.
+    """
+    deadline = _hedge_policy.deadline('first_token', model_name) if _hedge_policy.enabled else None
+    sent = asyncio.Event() if deadline is not None else None
+    stream = _stream_groq_once_async(model_name, prompt, max_tokens, use_cache, temperature, timeout, max_retries,
+                                     fail_fast, sent)
+    if deadline is None:
+        async for delta in stream:
+            yield delta
+        return
+    
+    def start_backup():
+        backup_model = _start_hedge(model_name)
+        if backup_model is None:
+            return None
+        return _stream_groq_once_async(backup_model, prompt, max_tokens, use_cache, temperature, timeout,
+                                       max_retries, fail_fast)
+    
+    async for delta in race_streams(stream, start_backup, deadline, on_winner=_hedge_policy.record_win,
+                                    started=sent):
+        yield delta
+
+async def _stream_groq_once_async(model_name, prompt, max_tokens, use_cache, temperature, timeout, max_retries,
+                                  fail_fast=False, sent=None):
+    """Stream one completion (cache, breaker, rate limit, retries) without hedging; sets sent once it is sent"""
+    started = time.monotonic()
+    cache_key = _make_cache_key(model_name, prompt, max_tokens, temperature)
+    
+    if use_cache:
+        cached = _response_cache.get(cache_key)
+        if cached is not None:
+            print("✓ Using cached response")
+            _telemetry.record_call('groq', model_name, cache='hit', duration=time.monotonic() - started)
+            yield cached
+            return
+    
+    call = _new_call_stats()
+    error = None
+    is_probe = False
+    priority = None
+    try:
+        reserved_tokens = estimate_tokens(prompt) + max_tokens
+        _check_keys_usable(fail_fast)
+        call['queue_wait'] = await within_deadline(_scheduler.acquire(tokens=reserved_tokens), 'Groq request')
+        priority = current_priority()
+        is_probe = _groq_breaker.before_call()
+        key, wait = await _wait_for_rate_limit(reserved_tokens, fail_fast=fail_fast)
+        call['queue_wait'] += wait
+        if sent is not None:
+            sent.set()
+        
+        payload = _build_chat_payload(model_name, prompt, max_tokens, temperature, stream=True)
+        client = http_client.get_client()
+        
+        base_delay = 2
+        parts = []
+        actual_tokens = None
+        tried = {key}  # moving to a key this request has not used yet is not a retry
+        attempt = 0
+        
+        while True:
+            call['retries'] = attempt + len(tried) - 1
+            sleep_s = None
+            switch_key = False
+            rotate = False
+            try:
+                sent_at = time.monotonic()
+                async with client.stream('POST', _GROQ_CHAT_URL, headers=_groq_headers(key.key), json=payload,
+                                         timeout=deadlines.clip_timeout(timeout, 'Groq request')) as response:
+                    status = response.status_code
+                    call['status_codes'].append(status)
+                    key.limiter.observe_headers(response.headers)
+                    if status != 429:
+                        _key_pool.report(key, status, sent_at=sent_at)
+                    if status in (429, 503):
+                        if status == 503:
+                            _record_groq_failure(sent_at)
+                        sleep_s = _retry_after_seconds(response, attempt, base_delay)
+                        if status == 429:
+                            _key_pool.report(key, status, retry_after=sleep_s, sent_at=sent_at)
+                            switch_key = True
+                            rotate = _key_pool.has_fresh_key(exclude=tried, tokens=reserved_tokens)
+                        else:
+                            key.limiter.block_for(sleep_s)
+                        if rotate:
+                            print("⏳ Rate limited. Retrying on another key...")
+                        elif attempt == max_retries:
+                            raise ProviderUnavailableError("⚠️ Rate limit exceeded. Your API quota may be exhausted.",
+                                                           retry_after=sleep_s)
+                        elif switch_key:
+                            print(f"⏳ Rate limited. Retrying on the next available key... (Attempt {attempt + 1}/{max_retries})")
+                        else:
+                            print(f"⏳ Rate limited. Waiting {sleep_s:.1f} seconds... (Attempt {attempt + 1}/{max_retries})")
+                    elif status in (401, 403):
+                        # Rejected key: go straight on to a usable key not tried yet
+                        if not _key_pool.has_fresh_key(exclude=tried, tokens=reserved_tokens):
+                            raise _auth_error(status)
+                        switch_key = rotate = True
+                    elif status >= 400:
+                        if status >= 500:
+                            _record_groq_failure(sent_at)
+                        raise Exception(f"API Request failed (status {status})")
+                    else:
+                        async for line in response.aiter_lines():
+                            # SSE frames look like "data: {...}"; blank lines separate events
+                            if not line or not line.startswith('data:'):
+                                continue
+                            data = line[len('data:'):].strip()
+                            if data == '[DONE]':
+                                break
+                            event = json.loads(data)
+                            if 'error' in event:
+                                raise Exception(f"API error: {event['error'].get('message', str(event['error']))}")
+                            usage = _usage(event)
+                            if usage:
+                                actual_tokens = usage.get('total_tokens') or actual_tokens
+                                call['prompt_tokens'] = usage.get('prompt_tokens', 0)
+                                call['completion_tokens'] = usage.get('completion_tokens', 0)
+                            choices = event.get('choices') or []
+                            if not choices:
+                                continue
+                            delta = choices[0].get('delta', {}).get('content')
+                            deadlines.check('Groq stream')
+                            if delta:
+                                if not parts:
+                                    _hedge_policy.record('first_token', model_name, time.monotonic() - sent_at)
+                                parts.append(delta)
+                                yield delta
+                        latency = time.monotonic() - sent_at
+                        call['latency'] = latency
+                        _model_policy.record_latency(model_name, latency)
+                        _groq_breaker.record_success(latency)
+                        break
+            except httpx.HTTPError as e:
+                if isinstance(e, httpx.TimeoutException):
+                    call['status_codes'].append('timeout')
+                    deadlines.check('Groq stream')
+                _record_groq_failure(sent_at)
+                # Once tokens have been shown, a retry would duplicate them
+                if parts or attempt == max_retries:
+                    raise Exception(f"API Request failed: {str(e)}")
+                sleep_s = base_delay * (2 ** attempt) + random.uniform(0, 1)
+                print(f"Request failed. Retrying in {sleep_s:.2f} seconds...")
+            
+            if rotate:
+                key, _ = await _switch_key(key, reserved_tokens, exclude=tried, fail_fast=fail_fast)
+                tried.add(key)
+                continue
+            attempt += 1
+            if switch_key:
+                key, _ = await _switch_key(key, reserved_tokens, fail_fast=fail_fast)
+            else:
+                deadlines.ensure_time_for(sleep_s, 'Groq stream')
+                await asyncio.sleep(sleep_s)
+        
+        if parts:
+            if not actual_tokens:
+                actual_tokens = estimate_tokens(prompt) + estimate_tokens(''.join(parts))
+            key.limiter.settle(reserved_tokens, actual_tokens)
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        if priority is not None:
+            _scheduler.release(priority)
+        if is_probe:
+            _groq_breaker.release_probe()
+        _telemetry.record_call('groq', model_name, status=_call_status(error),
+                               duration=time.monotonic() - started, **call)
+    
+    if use_cache and parts:
+        _response_cache.set(cache_key, ''.join(parts).strip())
+
+def stream_groq_request(model_name, prompt, max_tokens=2048, use_cache=True, temperature=0.7, timeout=60):
+    """
+    Streaming variant of make_groq_request
+    
+    Synchronous generator over stream_groq_request_async.
+    
+    Yields:
+        str: incremental pieces of the completion
+    """
+    yield from http_client.iterate_sync(
+        stream_groq_request_async(model_name, prompt, max_tokens, use_cache, temperature, timeout)
+    )
+
+class GroqProvider(LLMProvider):
+    """Groq backend (primary) for the provider router"""
+    
+    name = 'groq'
+    
+    @property
+    def available(self):
+        return bool(API_KEY)
+    
+    def choose_model(self, preferred='auto', task='summary', prompt=''):
+        return choose_best_model(preferred, task=task, prompt_tokens=estimate_tokens(prompt))
+    
+    async def complete(self, prompt, preferred='auto', max_tokens=2048, temperature=0.7, fail_fast=False,
+                       task='summary'):
+        return await make_groq_request_async(
+            self.choose_model(preferred, task, prompt), prompt, max_tokens=max_tokens, temperature=temperature,
+            max_retries=0 if fail_fast else 3, fail_fast=fail_fast,
+        )
+    
+    async def stream(self, prompt, preferred='auto', max_tokens=2048, temperature=0.7, fail_fast=False,
+                     task='summary'):
+        async for delta in stream_groq_request_async(
+            self.choose_model(preferred, task, prompt), prompt, max_tokens=max_tokens, temperature=temperature,
+            max_retries=0 if fail_fast else 3, fail_fast=fail_fast,
+        ):
+            yield delta
+
+# Providers in priority order; the router prefers the healthiest and fails over on 429/503
+_router = LLMRouter([GroqProvider(), paper_fetcher.GeminiProvider()])
+
+@contextmanager
+def _call_scope(priority=None, deadline_at=None):
+    """Apply a caller's scheduling class and absolute deadline to the requests made inside"""
+    with request_priority(priority or current_priority()), deadline_scope(at=deadline_at):
+        yield
+
+def _deadline_at(deadline):
+    """Absolute monotonic deadline for a budget in seconds (None stays None)"""
+    return None if deadline is None else time.monotonic() + deadline
+
+async def _in_scope(coro, priority=None, deadline_at=None):
+    """Await a coroutine inside _call_scope (for coroutines handed to run_sync)"""
+    with _call_scope(priority, deadline_at):
+        return await coro
+
+async def generate_async(prompt, preferred='auto', max_tokens=2048, temperature=0.7, task='summary',
+                         priority=None, deadline=None):
+    """
+    Complete a prompt on the healthiest configured provider
+    
+    Args:
+        priority: 'interactive', 'normal' or 'background' scheduling class;
+                  None keeps the caller's current class (normal by default)
+        deadline: Seconds the whole call may take, including queueing, retries,
+                  backoff and failover (None = no limit beyond per-attempt timeouts)
+    
+    Raises:
+        DeadlineExceededError: if the answer cannot arrive within deadline
+    """
+    with _call_scope(priority, _deadline_at(deadline)):
+        return await _router.complete(prompt, preferred, max_tokens, temperature, task)
+
+async def _with_scope(agen, priority=None, deadline_at=None):
+    """
+    Drive an async generator at a scheduling priority and deadline
+    
+    iterate_sync runs each step in a fresh task, so the scope is set
+    around every step rather than once for the whole stream.
+    """
+    try:
+        while True:
+            with _call_scope(priority, deadline_at):
+                try:
+                    item = await agen.__anext__()
+                except StopAsyncIteration:
+                    return
+            yield item
+    finally:
+        await agen.aclose()
+
+def generate_stream(prompt, preferred='auto', max_tokens=2048, temperature=0.7, task='summary', priority=None,
+                    deadline=None, deadline_at=None):
+    """
+    Stream a completion from the healthiest configured provider
+    
+    priority and deadline are as for generate_async; the deadline covers the
+    whole stream (DeadlineExceededError is raised mid-stream if it runs out).
+    deadline_at is an absolute time.monotonic() deadline, used instead.
+    """
+    deadline_at = deadline_at if deadline_at is not None else _deadline_at(deadline)
+    agen = _router.stream(prompt, preferred, max_tokens, temperature, task)
+    if priority is not None or deadline_at is not None:
+        agen = _with_scope(agen, priority, deadline_at)
+    yield from http_client.iterate_sync(agen)
+
+# Long-document (map-reduce) summarization settings
+_SINGLE_PASS_MAX_CHARS = 30000  # Inputs above this are summarized hierarchically
+_CHUNK_TOKENS = 5000  # Token budget per map chunk
+_CHUNK_OVERLAP_TOKENS = 150  # Context carried over between adjacent chunks
+_MAX_CHUNK_WORKERS = 4  # Concurrent chunk requests
+_PARTIAL_SUMMARY_TOKENS = 700  # max_tokens for each partial summary
+# Optional extractive pre-compression budget in prompt tokens (0 = off)
+_PRECOMPRESS_TOKENS = int(os.getenv('SUMMARY_PRECOMPRESS_TOKENS', '0'))
+
+def _split_into_chunks(text, max_tokens=_CHUNK_TOKENS, overlap_tokens=_CHUNK_OVERLAP_TOKENS):
+    """
+    Split text into chunks of roughly max_tokens, preferring paragraph boundaries
+    
+    Returns:
+        list[str]: chunks in document order
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    overlap_chars = overlap_tokens * CHARS_PER_TOKEN
+    
+    # Break oversized paragraphs so every piece fits in one chunk
+    pieces = []
+    for para in text.split('\n\n'):
+        para = para.strip()
+        if not para:
+            continue
+        while len(para) > max_chars:
+            cut = para.rfind(' ', 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            pieces.append(para[:cut])
+            para = para[cut:].strip()
+        if para:
+            pieces.append(para)
+    
+    chunks = []
+    current = ''
+    for piece in pieces:
+        if current and len(current) + len(piece) + 2 > max_chars:
+            chunks.append(current)
+            tail = current[-overlap_chars:] if overlap_chars else ''
+            current = tail if len(tail) + len(piece) + 2 <= max_chars else ''
+        current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _build_summary_prompt(text):
+    return f"""You are an expert AI research summarizer. Summarize the following content clearly and concisely using the structure below:
 
 📘 **Title:** (Give a short title related to the topic)
 
@@ -236,28 +946,358 @@ def summarize_text(text, preferred='auto'):
 
 Content to summarize:
 {text}"""
+
+def _build_partial_prompt(chunk, index, total):
+    return f"""You are summarizing part {index} of {total} of a longer research document.
+Write concise notes covering the key claims, methods, results (keep important numbers) and any reference URLs in this part.
+Do not add an introduction or conclusion; other parts are summarized separately.
+
+Part {index} of {total}:
+{chunk}"""
+
+async def _summarize_chunks_async(preferred, chunks):
+    """Map step: summarize chunks concurrently, returning notes in document order"""
+    # Stay within what the rate limiter can serve right now
+    remaining = get_rate_limit_status()['remaining_in_minute']
+    semaphore = asyncio.Semaphore(max(1, min(_MAX_CHUNK_WORKERS, len(chunks), remaining)))
+    
+    async def run(index, chunk):
+        prompt = _build_partial_prompt(chunk, index, len(chunks))
+        async with semaphore:
+            return await generate_async(prompt, preferred, max_tokens=_PARTIAL_SUMMARY_TOKENS)
+    
+    return await asyncio.gather(*(run(i, c) for i, c in enumerate(chunks, start=1)))
+
+async def _build_long_summary_prompt_async(preferred, text):
+    """Map step plus recursive reduction; returns the final summary prompt"""
+    notes = await _summarize_chunks_async(preferred, _split_into_chunks(text))
+    combined = '\n\n'.join(notes)
+    
+    # Reduce until the notes fit into a single final prompt
+    while len(combined) > _SINGLE_PASS_MAX_CHARS:
+        notes = await _summarize_chunks_async(preferred, _split_into_chunks(combined, overlap_tokens=0))
+        combined = '\n\n'.join(notes)
+    
+    return _build_summary_prompt(combined)
+
+def set_precompression(token_budget):
+    """
+    Enable extractive pre-compression of long inputs before summarization
     
+    Inputs estimated above token_budget are cut down to their most central
+    sentences (TextRank over TF-IDF, see utils.extractive), with boilerplate such
+    as reference lists and repeated page headers removed. 0 or None disables it.
+    """
+    global _PRECOMPRESS_TOKENS
+    _PRECOMPRESS_TOKENS = int(token_budget or 0)
+
+def _precompress(text):
+    """Apply extractive pre-compression if enabled and the text exceeds the budget"""
+    if not _PRECOMPRESS_TOKENS or estimate_tokens(text) <= _PRECOMPRESS_TOKENS:
+        return text
+    # Imported lazily: scikit-learn is only needed when pre-compression is on
+    from utils.extractive import compress_text
+    compressed = compress_text(text, _PRECOMPRESS_TOKENS)
+    print(f"🗜️ Pre-compressed input: ~{estimate_tokens(text)} -> ~{estimate_tokens(compressed)} tokens")
+    return compressed
+
+async def _build_text_summary_prompt_async(preferred, text, mode):
+    """Pick single-pass or hierarchical prompting for summarize_text(_stream)"""
+    if _PRECOMPRESS_TOKENS:
+        # Sentence ranking is CPU work; keep it off the shared event loop
+        text = await asyncio.to_thread(_precompress, text)
+    
+    if mode == 'hierarchical' or (mode == 'auto' and len(text) > _SINGLE_PASS_MAX_CHARS):
+        return await _build_long_summary_prompt_async(preferred, text)
+    
+    # Truncate text if too long (approximate token limit)
+    if len(text) > _SINGLE_PASS_MAX_CHARS:
+        text = text[:_SINGLE_PASS_MAX_CHARS] + "\n\n[Content truncated due to length...]"
+    return _build_summary_prompt(text)
+
+def _lookup_near_duplicate(text, preferred, mode):
+    """Second cache tier: summary of a previously seen, nearly identical input"""
+    namespace = (PROMPT_TEMPLATE_VERSION, preferred, mode, _PRECOMPRESS_TOKENS)
+    summary, similarity = _near_duplicates.lookup(text, namespace=namespace)
+    if summary is not None:
+        print(f"✓ Using summary of near-duplicate input (similarity {similarity:.2f})")
+    return summary
+
+def _remember_summary(text, summary, preferred, mode):
+    _near_duplicates.add(text, summary, namespace=(PROMPT_TEMPLATE_VERSION, preferred, mode, _PRECOMPRESS_TOKENS))
+
+async def summarize_text_async(text, preferred='auto', mode='auto', use_cache=True, deadline=None):
+    """
+    Async summarization core shared by summarize_text and summarize_many
+    
+    With use_cache, inputs that differ from an earlier one only by whitespace,
+    page headers/numbers or appended user notes reuse its summary.
+    deadline (seconds) bounds the whole summary, map-reduce chunks included.
+    
+    Raises:
+        DeadlineExceededError: if the summary cannot be finished within deadline
+        Exception: on API failure (summarize_text turns this into an "[ERROR]" string)
+    """
+    if deadline is not None:
+        with deadline_scope(deadline):
+            return await summarize_text_async(text, preferred, mode, use_cache)
+    if use_cache:
+        summary = _lookup_near_duplicate(text, preferred, mode)
+        if summary is not None:
+            return summary
+    
+    prompt = await _build_text_summary_prompt_async(preferred, text, mode)
+    # Provider routing, rate limiting and caching happen below generate_async
+    summary = await generate_async(prompt, preferred, max_tokens=2048)
+    if use_cache:
+        _remember_summary(text, summary, preferred, mode)
+    return summary
+
+def summarize_long_text(text, preferred='auto'):
+    """
+    Hierarchical (map-reduce) summarization for documents too long for one prompt
+    
+    The text is split into token-budgeted chunks that are summarized concurrently;
+    the partial notes are reduced (recursively if still too long) into the standard
+    Title/Summary/Insights/References format.
+    
+    Raises:
+        Exception: if any chunk or the final reduce request fails
+    """
+    return http_client.run_sync(summarize_text_async(text, preferred, mode='hierarchical'))
+
+def summarize_text(text, preferred='auto', mode='auto', deadline=None):
+    """
+    Summarize text with the routed LLM provider (Groq, failing over to Gemini)
+    
+    Args:
+        text: Content to summarize
+        preferred: 'auto', 'pro' or 'flash'
+        mode: 'auto' (hierarchical for long inputs), 'single' (one prompt,
+              truncated at 30,000 characters) or 'hierarchical'
+        deadline: Seconds the whole summary may take
+    
+    Raises:
+        DeadlineExceededError: if deadline runs out (other failures return an "[ERROR]" string)
+    """
     try:
-        # Rate limiting is now handled inside make_groq_request
-        return make_groq_request(model_name, prompt, max_tokens=2048)
+        return http_client.run_sync(summarize_text_async(text, preferred, mode, deadline=deadline))
+    except DeadlineExceededError:
+        raise
     except Exception as e:
         return f"[ERROR] {str(e)}"
 
-def generate_chat_response(prompt, model_name='flash'):
+def summarize_text_stream(text, preferred='auto', mode='auto', deadline=None):
+    """
+    Streaming variant of summarize_text
+    
+    Yields summary text as it is generated. Errors are yielded as an
+    "[ERROR] ..." chunk, matching summarize_text's return convention, except
+    DeadlineExceededError, which is raised when deadline (seconds) runs out.
+    """
+    deadline_at = _deadline_at(deadline)
+    cached = _lookup_near_duplicate(text, preferred, mode)
+    if cached is not None:
+        yield cached
+        return
+    
+    prefetch = _prefetching.get(_prefetch_key(text, preferred, mode))
+    if prefetch is not None:
+        # Already being summarized in the background: wait for it rather than sending it again
+        try:
+            yield http_client.run_sync(_in_scope(_join_prefetch(prefetch), deadline_at=deadline_at))
+            return
+        except DeadlineExceededError:
+            raise
+        except (Exception, asyncio.CancelledError, concurrent.futures.CancelledError):
+            pass
+    
+    parts = []
+    try:
+        prompt = http_client.run_sync(
+            _in_scope(_build_text_summary_prompt_async(preferred, text, mode), deadline_at=deadline_at)
+        )
+        for delta in generate_stream(prompt, preferred, max_tokens=2048, deadline_at=deadline_at):
+            parts.append(delta)
+            yield delta
+        _remember_summary(text, ''.join(parts).strip(), preferred, mode)
+    except DeadlineExceededError:
+        raise
+    except Exception as e:
+        yield f"\n\n[ERROR] {str(e)}" if parts else f"[ERROR] {str(e)}"
+
+async def _summarize_batch_item(index, text, preferred, mode, semaphore, priority=BACKGROUND, deadline_at=None):
+    """Summarize one batch entry, capturing its error instead of raising"""
+    async with semaphore:
+        try:
+            with _call_scope(priority, deadline_at):
+                summary = await summarize_text_async(text, preferred, mode)
+            return {'index': index, 'summary': summary, 'error': None}
+        except Exception as e:
+            return {'index': index, 'summary': None, 'error': str(e)}
+
+async def summarize_many_async(texts, preferred='auto', max_concurrency=4, mode='auto', priority=BACKGROUND,
+                               deadline=None):
+    """Async batch summarization; returns per-item results in input order"""
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    deadline_at = _deadline_at(deadline)
+    with _scheduler.capacity(priority or current_priority(), max(1, max_concurrency)):
+        return await asyncio.gather(
+            *(_summarize_batch_item(i, t, preferred, mode, semaphore, priority, deadline_at)
+              for i, t in enumerate(texts))
+        )
+
+async def iter_summaries_async(texts, preferred='auto', max_concurrency=4, mode='auto', priority=BACKGROUND,
+                               deadline=None):
+    """Async batch summarization yielding per-item results as they complete"""
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    deadline_at = _deadline_at(deadline)
+    with _scheduler.capacity(priority or current_priority(), max(1, max_concurrency)):
+        tasks = [
+            asyncio.ensure_future(_summarize_batch_item(i, t, preferred, mode, semaphore, priority, deadline_at))
+            for i, t in enumerate(texts)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Stop outstanding work if the consumer abandons the iterator
+            for task in tasks:
+                task.cancel()
+
+def summarize_many(texts, preferred='auto', max_concurrency=4, ordered=True, mode='auto', priority=BACKGROUND,
+                   deadline=None):
     """
-    Generate a conversational response using Groq API
+    Summarize many texts with bounded concurrency
+    
+    Every call goes through the shared rate limiter, response cache and
+    in-flight coalescing, so the batch never exceeds the API quota and repeated
+    texts are only sent once. A failing item does not fail the batch.
+    Batches run at background priority by default, so chat and single
+    summaries are admitted ahead of them.
     
     Args:
-        prompt: User's question with context
-        model_name: 'flash' for faster responses, 'pro' for detailed
+        texts: Iterable of texts to summarize
+        preferred: 'auto', 'pro' or 'flash'
+        max_concurrency: Maximum summaries in flight at once (the priority
+                         class's scheduler cap is raised to match for the batch)
+        ordered: True to return a list in input order, False to get an
+                 iterator yielding results as they complete
+        mode: Passed through to summarize_text
+        priority: Scheduling class for the batch's requests
+        deadline: Seconds the whole batch may take; items not finished by then
+                  fail with a deadline error instead of delaying the batch
     
     Returns:
-        str: AI-generated response
+        list[dict] | Iterator[dict]: {'index', 'summary', 'error'} per input text,
+        with 'error' set (and 'summary' None) for items that failed
+    """
+    texts = list(texts)
+    if ordered:
+        return http_client.run_sync(
+            summarize_many_async(texts, preferred, max_concurrency, mode, priority, deadline)
+        )
+    return http_client.iterate_sync(iter_summaries_async(texts, preferred, max_concurrency, mode, priority, deadline))
+
+# Background prefetch: summaries the user is likely to ask for next, on spare quota
+_PREFETCH_SPARE_REQUESTS = int(os.getenv('PREFETCH_SPARE_REQUESTS', '5'))  # per-minute requests left alone
+_PREFETCH_SPARE_TOKENS = int(os.getenv('PREFETCH_SPARE_TOKENS', '2500'))  # per-minute tokens left alone
+_PREFETCH_MAX_WAIT = float(os.getenv('PREFETCH_MAX_WAIT_SECONDS', '120'))  # give up if no spare budget by then
+_prefetching = {}  # prefetch key -> asyncio.Task of the summary currently being prefetched
+
+def _prefetch_key(text, preferred, mode):
+    return hashlib.sha256(f"{preferred}|{mode}|{text}".encode('utf-8')).hexdigest()
+
+def _has_spare_budget(tokens):
+    """True if the Groq keys could send this request and still keep the spare margin for users"""
+    status = _key_pool.status()
+    if status['remaining_in_minute'] <= _PREFETCH_SPARE_REQUESTS:
+        return False
+    tokens_left = status.get('tokens_remaining_in_minute')
+    return tokens_left is None or tokens_left >= tokens + _PREFETCH_SPARE_TOKENS
+
+class SummaryPrefetch:
+    """Handle for a background prefetch started by prefetch_summaries"""
+    
+    def __init__(self, count):
+        self.states = ['queued'] * count  # queued -> running -> done | failed | cancelled | skipped
+        self.future = None
+    
+    def cancel(self):
+        """Stop the prefetch; the summary in flight (if any) is abandoned"""
+        if self.future is not None:
+            self.future.cancel()
+        self.states = ['cancelled' if s in ('queued', 'running') else s for s in self.states]
+    
+    @property
+    def done(self):
+        return self.future is None or self.future.done()
+
+async def _prefetch_async(handle, texts, preferred, mode):
+    with request_priority(BACKGROUND):
+        for rank, text in enumerate(texts):
+            if _lookup_near_duplicate(text, preferred, mode) is not None:
+                handle.states[rank] = 'done'
+                continue
+            # Only spend quota a user is not about to need
+            reserved = estimate_tokens(text) + 2048
+            waited = 0
+            while not _has_spare_budget(reserved):
+                if waited >= _PREFETCH_MAX_WAIT:
+                    print(f"Prefetch stopped: no spare rate-limit budget for {waited}s")
+                    handle.states[rank:] = ['skipped'] * (len(texts) - rank)
+                    return
+                await asyncio.sleep(1)
+                waited += 1
+            key = _prefetch_key(text, preferred, mode)
+            task = asyncio.ensure_future(summarize_text_async(text, preferred, mode))
+            _prefetching[key] = task
+            handle.states[rank] = 'running'
+            try:
+                await task
+                handle.states[rank] = 'done'
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            except Exception as e:
+                handle.states[rank] = 'failed'
+                print(f"Prefetch of result {rank + 1} failed: {e}")
+            finally:
+                if _prefetching.get(key) is task:
+                    del _prefetching[key]
+
+def prefetch_summaries(texts, preferred='auto', mode='auto'):
     """
-    model = choose_best_model(model_name)
+    Start summarizing texts in the background, one at a time in the given (rank) order
+    
+    Runs at background priority and only while the rate limit has spare
+    budget (skipped without Groq keys; stops after PREFETCH_MAX_WAIT_SECONDS
+    without spare budget), filling the response and near-duplicate caches so a later
+    summarize_text / summarize_text_stream call for the same input returns
+    at once. A streaming call for the item being prefetched joins it.
     
-    # Enhanced prompt for clearer responses
-    enhanced_prompt = f"""You are a helpful AI assistant specialized in explaining technical concepts clearly and concisely.
+    Args:
+        texts: Texts in the order they are likely to be requested
+        preferred: Must match the later summarize call for its cache to be hit
+        mode: Passed through to summarize_text
+    
+    Returns:
+        SummaryPrefetch: call cancel() on it when the texts become irrelevant
+    """
+    texts = list(texts)
+    handle = SummaryPrefetch(len(texts))
+    if not len(_key_pool):
+        # Spare budget is measured on the Groq keys; without any (Gemini only) it never frees up
+        handle.states = ['skipped'] * len(texts)
+        return handle
+    handle.future = http_client.submit(_prefetch_async(handle, texts, preferred, mode))
+    return handle
+
+async def _join_prefetch(task):
+    return await within_deadline(asyncio.shield(task), 'Summary')
+
+def _build_chat_prompt(prompt):
+    return f"""You are a helpful AI assistant specialized in explaining technical concepts clearly and concisely.
 
 Guidelines for your response:
 - Be direct and to the point
@@ -271,13 +1311,71 @@ User's question:
 {prompt}
 
 Provide a clear, well-organized response:"""
+
+def generate_chat_response(prompt, model_name='flash', deadline=None):
+    """
+    Generate a conversational response using the routed LLM provider
+    
+    Args:
+        prompt: User's question with context
+        model_name: 'flash' for faster responses, 'pro' for detailed
+        deadline: Seconds the reply may take (DeadlineExceededError after that)
     
+    Returns:
+        str: AI-generated response
+    """
     try:
-        # Rate limiting is now handled inside make_groq_request
-        return make_groq_request(model, enhanced_prompt, max_tokens=2048)
+        return http_client.run_sync(
+            generate_async(_build_chat_prompt(prompt), model_name, max_tokens=2048, task='chat',
+                           priority=INTERACTIVE, deadline=deadline)
+        )
+    except DeadlineExceededError:
+        raise
     except Exception as e:
         raise Exception(f"Chat generation failed: {str(e)}")
 
+def generate_chat_response_stream(prompt, model_name='flash', deadline=None):
+    """
+    Streaming variant of generate_chat_response
+    
+    Yields:
+        str: incremental pieces of the response
+    """
+    try:
+        yield from generate_stream(_build_chat_prompt(prompt), model_name, max_tokens=2048, task='chat',
+                                   priority=INTERACTIVE, deadline=deadline)
+    except DeadlineExceededError:
+        raise
+    except Exception as e:
+        raise Exception(f"Chat generation failed: {str(e)}")
+
+def summarize_chat_history(previous_summary, transcript):
+    """
+    Fold older chat messages into a short rolling summary (for utils.chat_context)
+    
+    Runs at interactive priority since a user is waiting on the reply it feeds.
+    
+    Args:
+        previous_summary: Summary of even earlier messages ('' if none)
+        transcript: The messages to fold in, one "Speaker: text" per line
+    
+    Returns:
+        str: Updated summary
+    """
+    prompt = f"""Update the running summary of a conversation between a user and the AI PaperIQ assistant.
+Keep facts, names, papers and open questions the assistant may need later. At most 150 words.
+
+Current summary:
+{previous_summary or '(none)'}
+
+New messages:
+{transcript}
+
+Updated summary:"""
+    return http_client.run_sync(
+        generate_async(prompt, 'flash', max_tokens=300, temperature=0.2, task='chat', priority=INTERACTIVE)
+    )
+
 # Optional: Add a function to test API connectivity
 def test_api_connection():
     """Test if the API key works and check quota"""
@@ -291,54 +1389,88 @@ def test_api_connection():
 # Optional: Clear cache
 def clear_cache():
     """Clear the response cache"""
-    global _response_cache
-    _response_cache = {}
+    _response_cache.clear()
+    _near_duplicates.clear()
     print("✓ Cache cleared")
 
 # Optional: Check cache size
 def get_cache_info():
     """Get information about the cache"""
-    return {
+    info = {
         'cached_responses': len(_response_cache),
-        'cache_keys': list(_response_cache.keys())[:5]  # Show first 5
+        'cache_keys': _response_cache.keys(limit=5)  # Show 5 most recent
     }
+    info.update(_response_cache.stats())
+    info['semantic'] = _near_duplicates.stats()
+    return info
 
 def get_rate_limit_status():
-    """Get current rate limiting status"""
-    global _request_times
-    current_time = datetime.now()
-    
-    # Clean up old requests
-    _request_times = [t for t in _request_times if current_time - t < timedelta(minutes=1)]
+    """
+    Get current rate limiting status, including the Groq circuit breaker state
     
-    requests_in_last_minute = len(_request_times)
-    remaining = max(0, _MAX_REQUESTS_PER_MINUTE - requests_in_last_minute)
+    Budgets are summed over the usable API keys; 'keys' has the per-key detail.
+    """
+    return dict(_key_pool.status(), circuit_breaker=_groq_breaker.status(), scheduler=_scheduler.status())
+
+def get_scheduler_status():
+    """Get per-priority queue lengths, requests in flight and average admission waits"""
+    return _scheduler.status()
+
+def configure_hedging(**overrides):
+    """
+    Adjust hedged-request settings at runtime
     
-    if _last_request_time:
-        seconds_since_last = (current_time - _last_request_time).total_seconds()
-        next_available = max(0, _MIN_REQUEST_INTERVAL - seconds_since_last)
-    else:
-        next_available = 0
+    Args:
+        enabled: Send backup requests for slow calls
+        percentile: Latency percentile used as the hedge deadline (e.g. 0.95)
+        budget_fraction: Max share of the per-minute request quota spent on hedges
+        backup_model: Backup model name, or None to hedge on the same model
+    """
+    _hedge_policy.configure(**overrides)
+
+def get_hedging_status():
+    """Get hedged-request settings and counters"""
+    return _hedge_policy.status()
+
+def get_telemetry_snapshot(recent=50):
+    """
+    Get per-call LLM metrics
     
+    Returns:
+        dict: 'summary' (per provider/model counters and latency/queue-wait/token
+        histograms), 'recent' (the last calls) and 'prometheus' (text exposition)
+    """
     return {
-        'requests_last_minute': requests_in_last_minute,
-        'remaining_in_minute': remaining,
-        'seconds_until_next_available': next_available
+        'summary': _telemetry.to_json(),
+        'recent': _telemetry.recent_calls(recent),
+        'prometheus': _telemetry.to_prometheus(),
     }
 
+def reset_telemetry():
+    """Clear all collected call metrics"""
+    _telemetry.reset()
+
+def get_circuit_breaker_status():
+    """Get the Groq circuit breaker state and its rolling error/latency window"""
+    return _groq_breaker.status()
+
+def get_provider_status():
+    """Rolling p50/p95 latency, error rate and routing rank per LLM provider"""
+    return _router.status()
+
 def list_available_models():
     """
     List all available Groq models
     Useful for debugging model availability issues
     """
-    url = "https://api.groq.com/openai/v1/models"
+    url = f"{_GROQ_API_BASE}/models"
     
     headers = {
         'Authorization': f'Bearer {API_KEY}'
     }
     
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = http_client.request('GET', url, headers=headers, timeout=30)
         response.raise_for_status()
         data = response.json()
         
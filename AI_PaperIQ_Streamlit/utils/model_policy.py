@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+
+# Defaults for the 'auto' model policy; override with configure() or env vars
+DEFAULT_POLICY = {
+    'small_model': 'llama-3.1-8b-instant',
+    'large_model': 'llama-3.3-70b-versatile',
+    # Inputs up to this many prompt tokens go to the small model
+    'small_max_tokens': {
+        'chat': int(os.getenv('MODEL_POLICY_CHAT_SMALL_MAX_TOKENS', '1500')),
+        'summary': int(os.getenv('MODEL_POLICY_SUMMARY_SMALL_MAX_TOKENS', '2000')),
+    },
+    # Target end-to-end latency (seconds) per task
+    'target_latency': {
+        'chat': float(os.getenv('MODEL_POLICY_CHAT_TARGET_LATENCY', '4')),
+        'summary': float(os.getenv('MODEL_POLICY_SUMMARY_TARGET_LATENCY', '20')),
+    },
+    # Minimum latency samples before live stats can override the size rule
+    'min_samples': 5,
+}
+
+_LOG_PATH = os.getenv('MODEL_POLICY_LOG_PATH')  # optional JSONL decision log
+
+
+class ModelPolicy:
+    """
+    Picks a model for preferred='auto' from input size, task, target latency
+    and live per-model latency.
+
+    Rules, in order:
+      1. Short inputs (<= small_max_tokens for the task) use the small model.
+      2. Longer inputs escalate to the large model...
+      3. ...unless its recent p95 latency misses the task's target while the
+         small model's p95 meets it, in which case the small model is used.
+    Every decision is kept in a bounded in-memory log (and appended to
+    MODEL_POLICY_LOG_PATH as JSON lines when set) for later tuning.
+    """
+
+    def __init__(self, window=50, **overrides):
+        self.config = json.loads(json.dumps(DEFAULT_POLICY))
+        self.configure(**overrides)
+        self._latencies = {}  # model -> deque of seconds
+        self._window = window
+        self._decisions = deque(maxlen=200)
+        self._lock = threading.Lock()
+
+    def configure(self, **overrides):
+        """Update policy settings; dict values (per-task maps) are merged"""
+        for key, value in overrides.items():
+            if isinstance(value, dict) and isinstance(self.config.get(key), dict):
+                self.config[key].update(value)
+            else:
+                self.config[key] = value
+
+    def record_latency(self, model, seconds):
+        with self._lock:
+            self._latencies.setdefault(model, deque(maxlen=self._window)).append(seconds)
+
+    def p95_latency(self, model):
+        with self._lock:
+            samples = sorted(self._latencies.get(model, ()))
+        if len(samples) < self.config['min_samples']:
+            return None
+        return samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+
+    def choose(self, task='summary', prompt_tokens=0, target_latency=None):
+        """
+        Returns:
+            str: model name
+        """
+        cfg = self.config
+        small, large = cfg['small_model'], cfg['large_model']
+        target = target_latency if target_latency is not None else cfg['target_latency'].get(task)
+        threshold = cfg['small_max_tokens'].get(task, cfg['small_max_tokens']['summary'])
+
+        if prompt_tokens <= threshold:
+            model, reason = small, f'input {prompt_tokens} <= {threshold} tokens'
+        else:
+            model, reason = large, f'input {prompt_tokens} > {threshold} tokens'
+            large_p95, small_p95 = self.p95_latency(large), self.p95_latency(small)
+            if (target is not None and large_p95 is not None and large_p95 > target
+                    and (small_p95 is None or small_p95 <= target)):
+                model = small
+                reason += f'; {large} p95 {large_p95:.1f}s misses {target:.0f}s target'
+
+        self._log({
+            'ts': time.time(), 'task': task, 'prompt_tokens': prompt_tokens,
+            'target_latency': target, 'model': model, 'reason': reason,
+        })
+        return model
+
+    def _log(self, decision):
+        with self._lock:
+            self._decisions.append(decision)
+        print(f"🧭 Model policy ({decision['task']}): {decision['model']} - {decision['reason']}")
+        if _LOG_PATH:
+            try:
+                with open(_LOG_PATH, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(decision) + '\n')
+            except OSError:
+                pass
+
+    def recent_decisions(self, limit=20):
+        with self._lock:
+            return list(self._decisions)[-limit:]
+
+    def latency_summary(self):
+        """Per-model sample count and p95 latency"""
+        with self._lock:
+            models = list(self._latencies)
+        return {m: {'samples': len(self._latencies[m]), 'p95_latency': self.p95_latency(m)} for m in models}
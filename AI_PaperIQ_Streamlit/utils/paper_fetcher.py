@@ -1,14 +1,20 @@
 import os
 from dotenv import load_dotenv
-import requests
-import json
+import asyncio
 import time
+import httpx
 import random
 try:
     import streamlit as st
 except Exception:
     st = None
 
+from utils import http_client
+from utils import deadline as deadlines
+from utils.deadline import DeadlineExceededError
+from utils.llm_providers import LLMProvider, ProviderUnavailableError
+from utils.telemetry import get_telemetry
+
 load_dotenv()
 
 API_KEY = os.getenv('GOOGLE_API_KEY')
@@ -17,8 +23,8 @@ if not API_KEY and st is not None:
         API_KEY = st.secrets.get('GOOGLE_API_KEY', None)
     except Exception:
         API_KEY = None
-if not API_KEY:
-    raise ValueError('Please set GOOGLE_API_KEY in .env or Streamlit secrets')
+
+_GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
 
 def choose_best_model(preferred='auto'):
     """Choose model based on preference - using Gemini REST API"""
@@ -29,28 +35,45 @@ def choose_best_model(preferred='auto'):
     else:  # auto - prefer flash (stable and fast)
         return 'gemini-2.0-flash'
 
-def summarize_text(text, preferred='auto'):
-    """Use Gemini REST API directly for compatibility with Python 3.8"""
-    model_name = choose_best_model(preferred)
-    
-    prompt = f"""You are an expert AI research summarizer.
+async def make_gemini_request_async(model_name, prompt, max_tokens=2048, temperature=0.7, timeout=30,
+                                    max_retries=4):
+    """
+    Call the Gemini generateContent REST endpoint with retries
 
-Summarize the following content clearly and concisely using the structure below:
+    Raises:
+        ProviderUnavailableError: if still rate limited (429/503) after retries
+        Exception: for any other API failure
+    """
+    started = time.monotonic()
+    call = {'latency': None, 'retries': 0, 'status_codes': [], 'prompt_tokens': 0, 'completion_tokens': 0}
+    status = 'error'
+    try:
+        text = await _gemini_attempts(model_name, prompt, max_tokens, temperature, timeout, max_retries, call)
+        status = 'ok'
+        return text
+    except ProviderUnavailableError:
+        status = 'rate_limited'
+        raise
+    except DeadlineExceededError:
+        status = 'deadline_exceeded'
+        raise
+    except asyncio.CancelledError:
+        status = 'cancelled'
+        raise
+    finally:
+        get_telemetry().record_call('gemini', model_name, status=status, duration=time.monotonic() - started,
+                                    **call)
+
+async def _gemini_attempts(model_name, prompt, max_tokens, temperature, timeout, max_retries, call):
+    if not API_KEY:
+        raise ValueError('Please set GOOGLE_API_KEY in .env or Streamlit secrets')
 
-📘 **Title:** (Give a short title related to the topic)
-🧠 **Summary:** (3-5 bullet points describing key points with detailed explanation)
-📊 **Insights:** (Highlight 3-4 analytical or comparative insights)
-🔗 **References:** (Add any reference URLs if relevant or say 'None')
+    url = _GEMINI_URL.format(model=model_name) + f"?key={API_KEY}"
 
-Content to summarize:
-{text}"""
-    
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent?key={API_KEY}"
-    
     headers = {
         'Content-Type': 'application/json'
     }
-    
+
     payload = {
         "contents": [{
             "parts": [{
@@ -58,23 +81,35 @@ Content to summarize:
             }]
         }],
         "generationConfig": {
-            "temperature": 0.7,
-            "maxOutputTokens": 2048,
+            "temperature": temperature,
+            "maxOutputTokens": max_tokens,
             "topP": 0.95,
         }
     }
-    
+
     try:
-        last_status = None
-        max_retries = 4
-        response = None
         for attempt in range(max_retries + 1):
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
-            last_status = response.status_code
-            if last_status in (429, 503):
-                if attempt == max_retries:
-                    break
+            call['retries'] = attempt
+            sent_at = time.monotonic()
+            response = await deadlines.within_deadline(
+                http_client.arequest('POST', url, headers=headers, json=payload,
+                                     timeout=deadlines.clip_timeout(timeout, 'Gemini request')),
+                'Gemini request',
+            )
+            status = response.status_code
+            call['latency'] = time.monotonic() - sent_at
+            call['status_codes'].append(status)
+            if status in (429, 503):
                 retry_after = response.headers.get('Retry-After')
+                if attempt == max_retries:
+                    try:
+                        retry_after = int(retry_after) if retry_after else None
+                    except ValueError:
+                        retry_after = None
+                    raise ProviderUnavailableError(
+                        "Rate limit or service unavailable. Please wait a moment and try again.",
+                        retry_after=retry_after,
+                    )
                 if retry_after:
                     try:
                         sleep_s = int(retry_after)
@@ -82,119 +117,51 @@ Content to summarize:
                         sleep_s = 1 + random.uniform(0, 0.25)
                 else:
                     sleep_s = min(2 ** attempt, 16) + random.uniform(0, 0.25)
-                time.sleep(sleep_s)
+                deadlines.ensure_time_for(sleep_s, 'Gemini request')
+                await asyncio.sleep(sleep_s)
                 continue
             response.raise_for_status()
             result = response.json()
+            usage = result.get('usageMetadata') or {}
+            call['prompt_tokens'] = usage.get('promptTokenCount', 0)
+            call['completion_tokens'] = usage.get('candidatesTokenCount', 0)
             if 'candidates' in result and len(result['candidates']) > 0:
                 candidate = result['candidates'][0]
                 if 'content' in candidate and 'parts' in candidate['content']:
                     parts = candidate['content']['parts']
                     if len(parts) > 0 and 'text' in parts[0]:
-                        return parts[0]['text']
+                        return parts[0]['text'].strip()
                 finish_reason = candidate.get('finishReason', '')
                 if finish_reason == 'MAX_TOKENS':
-                    return "[ERROR] Response truncated - text too long. Try using a shorter input or the 'flash' model."
+                    raise Exception("Response truncated - text too long. Try using a shorter input or the 'flash' model.")
                 if finish_reason == 'SAFETY':
-                    return "[ERROR] Content blocked by safety filters."
+                    raise Exception("Content blocked by safety filters.")
             if 'error' in result:
-                return f"[ERROR] API error: {result['error'].get('message', str(result['error']))}"
-            return f"[ERROR] Unexpected response format. Finish reason: {result.get('candidates', [{}])[0].get('finishReason', 'unknown')}"
-        if last_status in (429, 503):
-            return "[ERROR] Rate limit or service unavailable. Please wait a moment and try again."
-        return "[ERROR] API Request failed."
-        
-    except requests.exceptions.RequestException as e:
+                raise Exception(f"API error: {result['error'].get('message', str(result['error']))}")
+            raise Exception(f"Unexpected response format. Finish reason: {result.get('candidates', [{}])[0].get('finishReason', 'unknown')}")
+    except httpx.HTTPError as e:
+        if isinstance(e, httpx.TimeoutException):
+            deadlines.check('Gemini request')
         status = ''
-        try:
-            if hasattr(e, 'response') and e.response is not None and hasattr(e.response, 'status_code'):
-                status = f" (status {e.response.status_code})"
-        except Exception:
-            status = ''
-        return f"[ERROR] API Request failed{status}. Please try again later."
-    except Exception as e:
-        return f'[ERROR] {str(e)}'
-def generate_chat_response(prompt, model_name='flash'):
-    """
-    Generate a conversational response using Gemini API
-    
-    Args:
-        prompt: User's question with context
-        model_name: 'flash' for faster responses, 'pro' for detailed
-    
-    Returns:
-        str: AI-generated response
-    """
-    model = choose_best_model(model_name)
-    
-    # Enhanced prompt for clearer responses
-    enhanced_prompt = f"""You are a helpful AI assistant specialized in explaining technical concepts clearly and concisely.
-
-Guidelines for your response:
-- Be direct and to the point
-- Use clear, simple language
-- Break down complex topics into digestible parts
-- Use bullet points or numbered lists when appropriate
-- Include examples when helpful
-- Keep responses well-structured and easy to read
-
-User's question:
-{prompt}
-
-Provide a clear, well-organized response:"""
-    
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={API_KEY}"
-    
-    headers = {
-        'Content-Type': 'application/json'
-    }
-    
-    payload = {
-        "contents": [{
-            "parts": [{
-                "text": enhanced_prompt
-            }]
-        }],
-        "generationConfig": {
-            "temperature": 0.7,
-            "maxOutputTokens": 2048,
-            "topP": 0.95,
-        }
-    }
-    
-    try:
-        max_retries = 4
-        for attempt in range(max_retries + 1):
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
-            status = response.status_code
-            
-            if status in (429, 503):
-                if attempt == max_retries:
-                    raise Exception("Rate limit exceeded. Please try again later.")
-                retry_after = response.headers.get('Retry-After')
-                if retry_after:
-                    try:
-                        sleep_s = int(retry_after)
-                    except ValueError:
-                        sleep_s = 1 + random.uniform(0, 0.25)
-                else:
-                    sleep_s = min(2 ** attempt, 16) + random.uniform(0, 0.25)
-                time.sleep(sleep_s)
-                continue
-            
-            response.raise_for_status()
-            result = response.json()
-            
-            if 'candidates' in result and len(result['candidates']) > 0:
-                candidate = result['candidates'][0]
-                if 'content' in candidate and 'parts' in candidate['content']:
-                    parts = candidate['content']['parts']
-                    if len(parts) > 0 and 'text' in parts[0]:
-                        return parts[0]['text'].strip()
-            
-            raise Exception("Unexpected API response format")
-            
-    except requests.exceptions.RequestException as e:
-        raise Exception(f"Chat generation failed: {str(e)}")
-    except Exception as e:
-        raise Exception(f"Chat generation failed: {str(e)}")
\ No newline at end of file
+        if isinstance(e, httpx.HTTPStatusError):
+            status = f" (status {e.response.status_code})"
+        raise Exception(f"API Request failed{status}. Please try again later.")
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini backend for the llm_service router"""
+
+    name = 'gemini'
+
+    @property
+    def available(self):
+        return bool(API_KEY)
+
+    def choose_model(self, preferred='auto', task='summary', prompt=''):
+        return choose_best_model(preferred)
+
+    async def complete(self, prompt, preferred='auto', max_tokens=2048, temperature=0.7, fail_fast=False,
+                       task='summary'):
+        return await make_gemini_request_async(
+            self.choose_model(preferred), prompt, max_tokens=max_tokens, temperature=temperature,
+            max_retries=0 if fail_fast else 4,
+        )
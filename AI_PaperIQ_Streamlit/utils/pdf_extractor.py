@@ -1,13 +1,584 @@
+import os
+import re
+import atexit
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
 import fitz  # PyMuPDF
 
-def extract_text_from_pdf(uploaded_file) -> str:
-    # uploaded_file is a Streamlit UploadedFile (has .read())
-    data = uploaded_file.read()
-    doc = fitz.open(stream=data, filetype='pdf')
+from utils.tokens import CHARS_PER_TOKEN
+
+# Bump when extraction output changes so stale disk entries are not served
+EXTRACTOR_VERSION = 1
+
+
+def _usable_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS/Windows
+        return os.cpu_count() or 1
+
+
+# Parallel extraction: documents with at least PDF_PARALLEL_MIN_PAGES pages are split
+# across up to PDF_EXTRACT_WORKERS processes (default: usable CPUs; never more, 1 disables it).
+# The threshold and pages per worker come from benchmarks/bench_pdf_extraction.py
+_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '200'))
+_PAGES_PER_WORKER = 50
+_MAX_WORKERS = min(int(os.getenv('PDF_EXTRACT_WORKERS', '0')) or _usable_cpus(), _usable_cpus())
+
+# Streamed uploads larger than PDF_SPOOL_MAX_MB are spilled to a temp file (in PDF_SPOOL_DIR)
+# instead of being read into memory
+_SPOOL_MAX_BYTES = int(float(os.getenv('PDF_SPOOL_MAX_MB', '16')) * 1024 * 1024)
+_SPOOL_DIR = os.getenv('PDF_SPOOL_DIR') or None
+_CHUNK_BYTES = 1 << 20
+
+
+class ExtractionCache:
+    """
+    Extracted PDF text keyed by a SHA-256 of the file bytes.
+
+    The in-memory tier is an LRU bounded by total characters, so a few huge
+    documents cannot pin unbounded memory; it survives Streamlit reruns because
+    it lives at module level. With a directory, texts are also written there
+    (one file per hash, oldest evicted past max_disk_bytes) and reused across
+    restarts and worker processes.
+    """
+
+    def __init__(self, max_chars=20_000_000, directory=None, max_disk_bytes=500_000_000):
+        self.max_chars = max_chars
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key -> text
+        self._chars = 0
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.txt')
+
+    def get(self, key):
+        with self._lock:
+            text = self._data.get(key)
+            if text is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return text
+        if self.directory:
+            try:
+                with open(self._path(key), encoding='utf-8') as f:
+                    text = f.read()
+                os.utime(self._path(key))  # LRU order on disk follows mtime
+            except OSError:
+                text = None
+            if text is not None:
+                self._remember(key, text)
+                with self._lock:
+                    self.hits += 1
+                return text
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _remember(self, key, text):
+        with self._lock:
+            if key in self._data:
+                self._chars -= len(self._data.pop(key))
+            self._data[key] = text
+            self._chars += len(text)
+            while self._chars > self.max_chars and len(self._data) > 1:
+                _, evicted = self._data.popitem(last=False)
+                self._chars -= len(evicted)
+
+    def set(self, key, text):
+        self._remember(key, text)
+        if self.directory:
+            try:
+                tmp = f'{self._path(key)}.{os.getpid()}.tmp'
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                os.replace(tmp, self._path(key))  # readers never see a partial file
+                self._evict_disk()
+            except OSError as e:
+                print(f"⚠️ Could not write PDF text cache: {e}")
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.txt'):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._chars = 0
+            self.hits = 0
+            self.misses = 0
+        if self.directory:
+            for name in os.listdir(self.directory):
+                if name.endswith('.txt'):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'chars': self._chars,
+                'max_chars': self.max_chars,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+                'directory': self.directory,
+            }
+
+
+def create_extraction_cache_from_env():
+    """
+    PDF_CACHE_MAX_CHARS: in-memory bound in characters of text (default 20M)
+    PDF_CACHE_DIR: also keep texts in this directory ('' = memory only, the default)
+    PDF_CACHE_DISK_MAX_MB: size bound of that directory (default 500)
+    """
+    return ExtractionCache(
+        max_chars=int(os.getenv('PDF_CACHE_MAX_CHARS', '20000000')),
+        directory=os.getenv('PDF_CACHE_DIR') or None,
+        max_disk_bytes=int(float(os.getenv('PDF_CACHE_DISK_MAX_MB', '500')) * 1024 * 1024),
+    )
+
+
+_cache = create_extraction_cache_from_env()
+
+
+def _disk_path(source):
+    """Path of a source that already lives on disk (a path, or a file opened from one), else None"""
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    name = getattr(source, 'name', None)
+    if isinstance(name, str) and not hasattr(source, 'getbuffer') and os.path.isfile(name):
+        return name
+    return None
+
+
+@contextmanager
+def spooled_pdf(source, max_memory=None):
+    """
+    Make a PDF source openable without copying it
+
+    Bytes and in-memory uploads (Streamlit's UploadedFile is a BytesIO) are
+    exposed as a memoryview of their existing buffer; files on disk by their
+    path. Other file objects are read in chunks: up to max_memory bytes stay
+    in memory, anything larger is spilled to a temp file that is removed on
+    exit, so the PDF bytes held per upload never exceed max_memory plus one
+    chunk. The read position of file objects is left unchanged.
+
+    Args:
+        source: Path, bytes, or (uploaded) file object
+        max_memory: In-memory threshold in bytes (default PDF_SPOOL_MAX_MB)
+
+    Yields:
+        memoryview | str: The PDF's bytes, or the path of a file holding them
+    """
+    path = _disk_path(source)
+    if path is not None:
+        yield path
+        return
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield memoryview(source)  # PyMuPDF copies bytearrays, not views of them
+        return
+    if hasattr(source, 'getbuffer'):
+        yield source.getbuffer()
+        return
+
+    max_memory = _SPOOL_MAX_BYTES if max_memory is None else max_memory
+    position = source.tell() if getattr(source, 'seekable', lambda: False)() else None
+    if position is not None:
+        source.seek(0)
+    buffer = bytearray()
+    spill = None
+    try:
+        for chunk in iter(lambda: source.read(_CHUNK_BYTES), b''):
+            if spill is None and len(buffer) + len(chunk) > max_memory:
+                spill = tempfile.NamedTemporaryFile(suffix='.pdf', dir=_SPOOL_DIR, delete=False)
+                spill.write(buffer)
+                buffer = bytearray()
+            if spill is None:
+                buffer += chunk
+            else:
+                spill.write(chunk)
+        if position is not None:
+            source.seek(position)
+        if spill is None:
+            yield memoryview(buffer)
+        else:
+            spill.close()
+            yield spill.name
+    finally:
+        if spill is not None:
+            spill.close()
+            os.remove(spill.name)
+
+
+@contextmanager
+def _temp_pdf(data):
+    """Write an in-memory PDF to a temp file (in PDF_SPOOL_DIR) for the pool workers; removed on exit"""
+    spill = tempfile.NamedTemporaryFile(suffix='.pdf', dir=_SPOOL_DIR, delete=False)
+    try:
+        with spill:
+            spill.write(data)
+        yield spill.name
+    finally:
+        os.remove(spill.name)
+
+
+def file_hash(data):
+    """
+    Cache key for a PDF's bytes
+
+    Args:
+        data: Bytes-like object, or the path of a PDF file (hashed in chunks
+              through one reused buffer, so memory use does not grow with the file)
+    """
+    digest = hashlib.sha256()
+    if isinstance(data, (str, os.PathLike)):
+        chunk = bytearray(_CHUNK_BYTES)
+        view = memoryview(chunk)
+        with open(data, 'rb', buffering=0) as f:
+            for size in iter(lambda: f.readinto(chunk), 0):
+                digest.update(view[:size])
+    else:
+        digest.update(data)
+    return digest.hexdigest() + f'-v{EXTRACTOR_VERSION}'
+
+
+def _open(src):
+    """Open what spooled_pdf yielded: by path (pages read on demand) or from the buffer"""
+    if isinstance(src, str):
+        return fitz.open(src)
+    return fitz.open(stream=src, filetype='pdf')
+
+
+def parse_page_ranges(spec, page_count):
+    """
+    Page indices (0-based, ascending, no duplicates) selected by a range spec
+
+    Args:
+        spec: None (all pages), a string of 1-based ranges like "1-5, 8, 12-"
+              (open-ended to the last page), or an iterable of 1-based page numbers
+        page_count: Pages in the document; a range running past the end is cut
+                    at the last page
+
+    Raises:
+        ValueError: for a malformed or reversed range, page 0, or a page/range
+                    starting past the end; the message is meant for the user
+    """
+    if spec is None or (isinstance(spec, str) and not spec.strip()):
+        return list(range(page_count))
+    selected = set()
+    if isinstance(spec, str):
+        for part in spec.split(','):
+            part = part.strip()
+            if not part:
+                continue
+            match = re.fullmatch(r'(\d*)\s*(-?)\s*(\d*)', part)
+            if not match or not (match.group(1) or match.group(3)) or (match.group(3) and not match.group(2)):
+                raise ValueError(f"Invalid page range: {part!r}")
+            first = int(match.group(1) or 1)
+            last = int(match.group(3) or page_count) if match.group(2) else first
+            if first < 1:
+                raise ValueError(f"Invalid page range {part!r}: pages are numbered from 1")
+            if first > page_count:
+                raise ValueError(f"Page range {part!r} starts past the end of the document ({page_count} pages)")
+            if last < first:
+                raise ValueError(f"Invalid page range {part!r}: the first page is after the last")
+            selected.update(range(first - 1, min(last, page_count)))
+    else:
+        for n in spec:
+            if not 1 <= n <= page_count:
+                raise ValueError(f"Page {n} is outside the document (pages 1-{page_count})")
+            selected.add(n - 1)
+    return sorted(selected)
+
+
+def iter_pdf_pages(source, pages=None, max_chars=None, max_tokens=None):
+    """
+    Yield (page_number, text) one page at a time
+
+    Pages are parsed lazily, so callers can start work on the first pages
+    while later ones are still unread, and only one page's text is held at a
+    time. Extraction stops once the character budget is used up; the page that
+    crosses it is cut to fit.
+
+    Args:
+        source: Path, bytes, or (uploaded) file object
+        pages: Page range spec (see parse_page_ranges); None for all pages
+        max_chars: Stop after this many characters of text
+        max_tokens: Same, as a token budget (~4 characters per token)
+
+    Yields:
+        (int, str): 1-based page number and its text ('' if the page fails to parse)
+    """
+    budgets = [b for b in (max_chars, None if max_tokens is None else max_tokens * CHARS_PER_TOKEN)
+               if b is not None]
+    remaining = min(budgets) if budgets else None
+    with spooled_pdf(source) as src:
+        doc = _open(src)
+        try:
+            yield from _iter_doc_pages(doc, parse_page_ranges(pages, doc.page_count), remaining)
+        finally:
+            doc.close()
+
+
+def _iter_doc_pages(doc, indices, remaining=None):
+    """(page_number, text) for the given pages of an open document, within a character budget"""
+    for index in indices:
+        if remaining is not None and remaining <= 0:
+            return
+        text = _page_text(doc, index)
+        if remaining is not None:
+            text = text[:remaining]
+            remaining -= len(text) + 1  # + the newline pages are joined with
+        yield index + 1, text
+
+
+def _page_text(doc, index):
+    try:
+        return doc.load_page(index).get_text()
+    except Exception:
+        return ''
+
+
+def _extract_pages_worker(path, indices):
+    """Process-pool task: open the shared file and extract the given pages in order"""
+    doc = fitz.open(path)
+    try:
+        return [_page_text(doc, i) for i in indices]
+    finally:
+        doc.close()
+
+
+def _ping_worker(_):
+    return os.getpid()
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    """Shared process pool, grown on demand; 'spawn' because the app process runs threads"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers < workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool.ready = threading.Event()
+            _pool.warming = False
+            _pool_workers = workers
+        return _pool
+
+
+def _discard_pool(pool):
+    """Drop a broken pool so the next large document starts a fresh one"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+            _pool_workers = 0
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _warm_up(pool, workers):
+    try:
+        list(pool.map(_ping_worker, range(workers)))
+    except Exception as e:
+        print(f"⚠️ PDF extraction workers failed to start: {e}")
+        _discard_pool(pool)
+        return
+    pool.ready.set()
+
+
+def _pool_ready(workers):
+    """
+    True once a pool with this many workers is running
+
+    Otherwise starts the workers in the background and returns False, so the
+    request that first needs them is extracted serially instead of waiting
+    for the processes to spawn and import PyMuPDF.
+    """
+    pool = _get_pool(workers)
+    with _pool_lock:
+        if pool.ready.is_set():
+            return True
+        if not pool.warming:
+            pool.warming = True
+            threading.Thread(target=_warm_up, args=(pool, workers), daemon=True).start()
+    return False
+
+
+def _map_pages(path, indices, workers):
+    """Extract pages of an on-disk PDF across the pool, in page order"""
+    # A few ranges per worker, so uneven pages balance out
+    chunk = max(1, -(-len(indices) // (workers * 3)))
+    ranges = [indices[i:i + chunk] for i in range(0, len(indices), chunk)]
     texts = []
-    for page in doc:
+    for part in _get_pool(workers).map(_extract_pages_worker, [path] * len(ranges), ranges):
+        texts.extend(part)
+    return texts
+
+
+def _parallel_pages(src, indices, workers):
+    """
+    Extract pages across the pool from what spooled_pdf yielded
+
+    In-memory PDFs are written to a temp file first, since the workers open
+    the document themselves.
+
+    Returns:
+        list[str] | None: Page texts in order, or None if a worker crashed
+        (the pool is discarded; the caller extracts serially instead)
+    """
+    pool = _get_pool(workers)
+    try:
+        if isinstance(src, str):
+            return _map_pages(src, indices, workers)
+        with _temp_pdf(src) as path:
+            return _map_pages(path, indices, workers)
+    except BrokenProcessPool as e:
+        print(f"⚠️ A PDF extraction worker crashed ({e}); extracting serially")
+        _discard_pool(pool)
+        return None
+
+
+@atexit.register
+def _shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+def choose_worker_count(page_count, max_workers=None):
+    """
+    Processes worth using for a document: one per _PAGES_PER_WORKER pages, up to
+    the CPU/config limit; 1 below PDF_PARALLEL_MIN_PAGES or on a single-CPU machine
+    """
+    max_workers = min(max_workers or _MAX_WORKERS, _usable_cpus())
+    if max_workers <= 1 or page_count < _PARALLEL_MIN_PAGES:
+        return 1
+    return max(1, min(max_workers, page_count // _PAGES_PER_WORKER))
+
+
+def extract_text_parallel(source, pages=None, workers=None):
+    """
+    Extract page texts using a process pool
+
+    The selected pages are split into contiguous ranges (a few per worker,
+    so uneven pages balance out), which the workers extract from the PDF's
+    file on disk (in-memory sources are written to a temp file first);
+    results are reassembled in page order. If a worker crashes, the pages
+    are extracted serially instead.
+
+    Args:
+        source: Path, bytes, or (uploaded) file object
+        pages: Page range spec (see parse_page_ranges)
+        workers: Process count; None picks one from the page count (choose_worker_count)
+
+    Returns:
+        list[str]: Text of each selected page, in order
+    """
+    with spooled_pdf(source) as src:
+        doc = _open(src)
         try:
-            texts.append(page.get_text())
-        except Exception:
-            texts.append('')
-    return '\n'.join(texts)
\ No newline at end of file
+            indices = parse_page_ranges(pages, doc.page_count)
+            workers = workers or choose_worker_count(len(indices))
+            texts = _parallel_pages(src, indices, workers) if workers > 1 else None
+            if texts is None:
+                texts = [_page_text(doc, i) for i in indices]
+            return texts
+        finally:
+            doc.close()
+
+
+def _extract_full(src, pages, max_chars):
+    """
+    Whole-document extraction from what spooled_pdf yielded
+
+    Large documents go to the process pool once its workers are up (uploads
+    are written to a temp file for them); everything else is read lazily,
+    within the budget, from the one open document.
+    """
+    doc = _open(src)
+    try:
+        indices = parse_page_ranges(pages, doc.page_count)
+        workers = choose_worker_count(len(indices)) if max_chars is None else 1
+        if workers > 1 and _pool_ready(workers):
+            texts = _parallel_pages(src, indices, workers)
+            if texts is not None:
+                return '\n'.join(texts)
+        return '\n'.join(text for _, text in _iter_doc_pages(doc, indices, max_chars))
+    finally:
+        doc.close()
+
+
+def extract_text_from_pdf(uploaded_file, use_cache=True, pages=None, max_chars=None) -> str:
+    """
+    Extract the text of a PDF
+
+    Args:
+        uploaded_file: Streamlit UploadedFile, any binary file object, a path, or bytes;
+                       opened without copying (see spooled_pdf)
+        use_cache: Reuse the text of a previous upload with identical bytes
+                   (reruns of the page script do not re-parse the PDF)
+        pages: Optional page range spec, e.g. "1-10" (see parse_page_ranges)
+        max_chars: Optional character budget; parsing stops once it is reached.
+                   Without one, large documents are extracted in parallel
+                   on multi-CPU machines (see extract_text_parallel).
+
+    Returns:
+        str: Page texts joined with newlines
+    """
+    with spooled_pdf(uploaded_file) as src:
+        if not use_cache:
+            return _extract_full(src, pages, max_chars)
+        key = file_hash(src)
+        if pages is not None or max_chars is not None:
+            key += '-' + hashlib.sha1(repr((pages, max_chars)).encode('utf-8')).hexdigest()[:12]
+        text = _cache.get(key)
+        if text is None:
+            text = _extract_full(src, pages, max_chars)
+            _cache.set(key, text)
+        return text
+
+
+def get_cache_info():
+    """Hit/miss counts and size of the extraction cache"""
+    return _cache.stats()
+
+
+def clear_cache():
+    _cache.clear()
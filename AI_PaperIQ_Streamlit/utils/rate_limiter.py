@@ -0,0 +1,178 @@
+import re
+import time
+import asyncio
+import threading
+from collections import deque
+
+
+def parse_reset_duration(value):
+    """
+    Parse rate-limit reset durations such as '7.66s', '2m59.56s', '120ms' or '1h2m'
+
+    Returns:
+        float | None: seconds, or None if the value cannot be parsed
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r'([\d.]+)(ms|h|m|s)', value):
+        matched = True
+        total += float(amount) * {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}[unit]
+    return total if matched else None
+
+
+class RateLimiter:
+    """
+    Thread-safe requests-per-minute and tokens-per-minute limiter with FIFO reservations.
+
+    Uses the generic cell rate algorithm (GCRA): the limiter keeps a single
+    "theoretical arrival time" per dimension instead of a list of timestamps,
+    so acquiring is O(1). Each caller reserves the next free slot under a lock
+    and then sleeps outside it, which makes waiting first-come first-served and
+    removes the check-then-sleep-then-record race between concurrent sessions.
+
+    The token dimension is charged with an estimate up front (prompt + max_tokens)
+    and corrected with settle() once the real usage is known; observe_headers()
+    folds in the server's x-ratelimit-* view so local state never runs ahead
+    of the provider's.
+    """
+
+    def __init__(self, max_per_minute=30, min_interval=1.0, max_tokens_per_minute=None,
+                 clock=time.monotonic):
+        self.max_per_minute = max_per_minute
+        self.max_tokens_per_minute = max_tokens_per_minute
+        self.min_interval = min_interval
+        self._emission_interval = 60.0 / max_per_minute
+        # A full minute's worth of requests may be sent back to back
+        self._tolerance = (max_per_minute - 1) * self._emission_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tat = 0.0  # theoretical arrival time of the next request
+        self._next_slot = 0.0  # earliest start allowed by min_interval
+        self._starts = deque()  # reserved start times, for reporting only
+        self._token_tat = 0.0  # theoretical time at which the token bucket is full again
+
+    def _seconds_per_token(self):
+        return 60.0 / self.max_tokens_per_minute
+
+    def _start_time(self, now, tokens):
+        start = max(now, self._tat - self._tolerance, self._next_slot)
+        if self.max_tokens_per_minute and tokens:
+            # A request larger than the whole budget waits for a full bucket
+            tokens = min(tokens, self.max_tokens_per_minute)
+            start = max(start, self._token_tat - (self.max_tokens_per_minute - tokens) * self._seconds_per_token())
+        return start
+
+    def peek(self, tokens=0):
+        """Seconds a reservation of this size would wait right now (nothing is reserved)"""
+        with self._lock:
+            now = self._clock()
+            return self._start_time(now, tokens) - now
+
+    def reserve(self, tokens=0):
+        """
+        Reserve the next request slot
+
+        Args:
+            tokens: Estimated tokens this request will consume (prompt + max_tokens)
+
+        Returns:
+            float: seconds the caller must wait before sending
+        """
+        with self._lock:
+            now = self._clock()
+            start = self._start_time(now, tokens)
+            if self.max_tokens_per_minute and tokens:
+                tokens = min(tokens, self.max_tokens_per_minute)
+                self._token_tat = max(self._token_tat, start) + tokens * self._seconds_per_token()
+            self._tat = max(self._tat, start) + self._emission_interval
+            self._next_slot = start + self.min_interval
+            self._starts.append(start)
+            self._trim(now)
+            return start - now
+
+    def acquire(self, tokens=0):
+        """Block the calling thread until its reserved slot; returns the wait in seconds"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens=0):
+        """Await the reserved slot without blocking the event loop"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def settle(self, reserved_tokens, actual_tokens):
+        """Correct the token budget once a response reports its real usage"""
+        if not self.max_tokens_per_minute:
+            return
+        with self._lock:
+            reserved_tokens = min(reserved_tokens, self.max_tokens_per_minute)
+            self._token_tat += (actual_tokens - reserved_tokens) * self._seconds_per_token()
+
+    def observe_headers(self, headers):
+        """
+        Align local state with the provider's x-ratelimit-* response headers
+
+        Only ever tightens the local budget, so concurrent in-flight responses
+        arriving out of order cannot hand out capacity twice.
+        """
+        limit = headers.get('x-ratelimit-limit-tokens')
+        remaining = headers.get('x-ratelimit-remaining-tokens')
+        # Time until the provider's token bucket is full again
+        reset = parse_reset_duration(headers.get('x-ratelimit-reset-tokens'))
+        with self._lock:
+            now = self._clock()
+            if limit:
+                try:
+                    self.max_tokens_per_minute = int(float(limit))
+                except ValueError:
+                    pass
+            if not self.max_tokens_per_minute:
+                return
+            if reset is not None:
+                self._token_tat = max(self._token_tat, now + reset)
+            if remaining:
+                try:
+                    used = max(0.0, self.max_tokens_per_minute - float(remaining))
+                except ValueError:
+                    return
+                self._token_tat = max(self._token_tat, now + used * self._seconds_per_token())
+
+    def block_for(self, seconds):
+        """Hold back every queued request for the given time (e.g. after a 429)"""
+        with self._lock:
+            self._next_slot = max(self._next_slot, self._clock() + seconds)
+
+    def _trim(self, now):
+        # Amortised O(1): each start time is popped at most once
+        while self._starts and now - self._starts[0] >= 60:
+            self._starts.popleft()
+
+    def status(self):
+        """Snapshot of the limiter state"""
+        with self._lock:
+            now = self._clock()
+            # How many requests could start right now without waiting
+            headroom = (now + self._tolerance - self._tat) / self._emission_interval + 1
+            remaining = int(max(0, min(self.max_per_minute, headroom)))
+            next_available = max(0.0, self._tat - self._tolerance - now, self._next_slot - now)
+            self._trim(now)
+            status = {
+                'requests_last_minute': sum(1 for t in self._starts if t <= now),
+                'remaining_in_minute': remaining,
+                'seconds_until_next_available': next_available,
+            }
+            if self.max_tokens_per_minute:
+                used = max(0.0, self._token_tat - now) / self._seconds_per_token()
+                status['tokens_per_minute_limit'] = self.max_tokens_per_minute
+                status['tokens_remaining_in_minute'] = int(max(0, self.max_tokens_per_minute - used))
+            return status
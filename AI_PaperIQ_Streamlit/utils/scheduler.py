@@ -0,0 +1,202 @@
+import os
+import time
+import asyncio
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from utils import deadline as deadlines
+
+INTERACTIVE = 'interactive'  # a user is waiting on the answer (Nova chat)
+NORMAL = 'normal'  # user-triggered summaries
+BACKGROUND = 'background'  # batches and prefetching
+PRIORITIES = (INTERACTIVE, NORMAL, BACKGROUND)
+
+# Priority of LLM requests made in the current task; asyncio copies it into child tasks
+_current_priority = contextvars.ContextVar('llm_request_priority', default=NORMAL)
+
+
+def current_priority():
+    """Priority class of requests made from the current context"""
+    return _current_priority.get()
+
+
+@contextmanager
+def request_priority(priority):
+    """Run the enclosed requests (and tasks started inside) at the given priority class"""
+    if priority not in PRIORITIES:
+        raise ValueError(f'Unknown priority {priority!r}; expected one of {PRIORITIES}')
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class _Waiter:
+    def __init__(self, priority, tokens, seq, enqueued_at):
+        self.priority = priority
+        self.tokens = tokens
+        self.seq = seq
+        self.enqueued_at = enqueued_at
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+
+    def wake(self):
+        try:
+            self.loop.call_soon_threadsafe(self.event.set)
+        except RuntimeError:  # loop already closed
+            pass
+
+
+class PriorityScheduler:
+    """
+    Priority admission in front of the API rate limiter.
+
+    Requests wait here, not in the limiter's FIFO queue: a request is only
+    admitted when the limiter can start it now (ready_after(tokens) <= 0), and
+    then the waiter with the best rank goes first. Rank is the class index
+    (interactive 0, normal 1, background 2) minus one per aging_seconds spent
+    waiting, so a background request that has waited long enough overtakes
+    fresh interactive ones and cannot starve. Each class also has a cap on
+    requests in flight, so a batch cannot occupy every connection; a caller
+    that asks for more workers (summarize_many's max_concurrency) raises its
+    class's cap for the duration via capacity().
+    """
+
+    def __init__(self, max_concurrency=None, aging_seconds=20.0, ready_after=None, clock=time.monotonic):
+        self.max_concurrency = {INTERACTIVE: 4, NORMAL: 4, BACKGROUND: 2}
+        self.max_concurrency.update(max_concurrency or {})
+        self.aging_seconds = aging_seconds
+        self.ready_after = ready_after or (lambda tokens: 0.0)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._waiting = []
+        self._running = {p: 0 for p in PRIORITIES}
+        self._admitted = {p: 0 for p in PRIORITIES}
+        self._waited = {p: 0.0 for p in PRIORITIES}
+        self._widened = {p: [] for p in PRIORITIES}  # caps requested by running capacity() blocks
+
+    def _rank(self, waiter, now):
+        aged = (now - waiter.enqueued_at) / self.aging_seconds if self.aging_seconds else 0.0
+        return (PRIORITIES.index(waiter.priority) - aged, waiter.seq)
+
+    def _cap(self, priority):
+        return max([self.max_concurrency[priority], *self._widened[priority]])
+
+    def _next(self):
+        """Best-ranked waiter whose class is under its concurrency cap"""
+        now = self._clock()
+        eligible = [w for w in self._waiting if self._running[w.priority] < self._cap(w.priority)]
+        return min(eligible, key=lambda w: self._rank(w, now), default=None)
+
+    def _notify(self):
+        for waiter in self._waiting:
+            waiter.wake()
+
+    async def acquire(self, priority=None, tokens=0):
+        """
+        Wait until this request may be sent
+
+        Args:
+            priority: Priority class; defaults to the current context's (see request_priority)
+            tokens: Estimated tokens, passed to ready_after
+
+        Returns:
+            float: Seconds spent waiting for admission
+
+        Raises:
+            DeadlineExceededError: when first in line but the limiter's wait
+                exceeds the current deadline (see utils.deadline)
+        """
+        priority = priority or current_priority()
+        if priority not in PRIORITIES:
+            raise ValueError(f'Unknown priority {priority!r}; expected one of {PRIORITIES}')
+        with self._lock:
+            waiter = _Waiter(priority, tokens, next(self._seq), self._clock())
+            self._waiting.append(waiter)
+            self._notify()
+        try:
+            while True:
+                timeout = None
+                with self._lock:
+                    waiter.event.clear()
+                    if self._next() is waiter:
+                        wait = self.ready_after(tokens)
+                        if wait <= 0:
+                            self._waiting.remove(waiter)
+                            self._running[priority] += 1
+                            self._admitted[priority] += 1
+                            waited = self._clock() - waiter.enqueued_at
+                            self._waited[priority] += waited
+                            self._notify()
+                            return waited
+                        # First in line but the limiter is further out than the caller can wait
+                        deadlines.ensure_time_for(wait, 'Queued LLM request')
+                        timeout = wait
+                try:
+                    await asyncio.wait_for(waiter.event.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            with self._lock:
+                if waiter in self._waiting:
+                    self._waiting.remove(waiter)
+                    self._notify()
+            raise
+
+    @contextmanager
+    def capacity(self, priority, max_concurrency):
+        """Allow at least max_concurrency requests of this class in flight while the block runs"""
+        if priority not in PRIORITIES:
+            raise ValueError(f'Unknown priority {priority!r}; expected one of {PRIORITIES}')
+        with self._lock:
+            self._widened[priority].append(max_concurrency)
+            self._notify()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._widened[priority].remove(max_concurrency)
+
+    def release(self, priority):
+        """Mark an admitted request of this class as finished"""
+        with self._lock:
+            self._running[priority] = max(0, self._running[priority] - 1)
+            self._notify()
+
+    def status(self):
+        """Per-class queue length, requests in flight, cap and average admission wait"""
+        with self._lock:
+            classes = {}
+            for p in PRIORITIES:
+                admitted = self._admitted[p]
+                classes[p] = {
+                    'waiting': sum(1 for w in self._waiting if w.priority == p),
+                    'running': self._running[p],
+                    'max_concurrency': self._cap(p),
+                    'admitted': admitted,
+                    'avg_wait_seconds': round(self._waited[p] / admitted, 3) if admitted else 0.0,
+                }
+            return {'aging_seconds': self.aging_seconds, 'classes': classes}
+
+
+def create_scheduler_from_env(ready_after=None):
+    """
+    Build the request scheduler from environment settings
+
+    LLM_CONCURRENCY_INTERACTIVE / _NORMAL / _BACKGROUND cap requests in flight
+    per class; LLM_PRIORITY_AGING_SECONDS sets how fast waiting requests gain rank.
+    """
+    caps = {}
+    for p in PRIORITIES:
+        value = os.getenv(f'LLM_CONCURRENCY_{p.upper()}')
+        if value:
+            caps[p] = max(1, int(value))
+    return PriorityScheduler(
+        max_concurrency=caps,
+        aging_seconds=float(os.getenv('LLM_PRIORITY_AGING_SECONDS', '20')),
+        ready_after=ready_after,
+    )
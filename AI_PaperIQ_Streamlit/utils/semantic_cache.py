@@ -0,0 +1,155 @@
+import os
+import re
+import zlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.text_cleanup import drop_page_furniture
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_USER_NOTES_RE = re.compile(r'\n\s*User Notes:.*\Z', re.DOTALL)
+_NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_text(text):
+    """
+    Reduce a document to the words that identify it
+
+    Drops appended "User Notes" (Search-topic flow), page-number lines, and
+    header/footer lines repeated on many pages, then lowercases and strips
+    punctuation and whitespace differences.
+    """
+    text = _USER_NOTES_RE.sub('', text)
+    kept = [line for line in drop_page_furniture([line.strip() for line in text.splitlines()]) if line]
+    return _NON_WORD_RE.sub(' ', ' '.join(kept).lower()).strip()
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index mapping previously summarized inputs to their summaries.
+
+    Each document is shingled into word n-grams and reduced to a MinHash
+    signature (vectorised with NumPy); LSH banding finds candidate documents in
+    O(bands) dictionary lookups, and the estimated Jaccard similarity of the
+    signatures decides whether a candidate is a near-duplicate.
+    """
+
+    def __init__(self, threshold=0.85, num_perm=64, bands=16, shingle_size=5, max_entries=500,
+                 min_words=40, seed=1):
+        if num_perm % bands:
+            raise ValueError('num_perm must be divisible by bands')
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.max_entries = max_entries
+        self.min_words = min_words
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=(num_perm, 1), dtype=np.int64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=(num_perm, 1), dtype=np.int64)
+        self._entries = OrderedDict()  # id -> (namespace, signature, value)
+        self._buckets = {}  # (namespace, band, band_hash) -> set(id)
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def signature(self, text):
+        """MinHash signature of normalized text, or None if it is too short"""
+        words = normalize_text(text).split()
+        if len(words) < self.min_words:
+            return None
+        k = self.shingle_size
+        shingles = {' '.join(words[i:i + k]) for i in range(len(words) - k + 1)}
+        hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.int64, count=len(shingles))
+        hashes %= _MERSENNE_PRIME
+        # (num_perm, n) universal hashes; the minimum per row is the signature
+        return ((self._a * hashes + self._b) % _MERSENNE_PRIME).min(axis=1)
+
+    def _band_keys(self, namespace, sig):
+        for band in range(self.bands):
+            chunk = sig[band * self.rows:(band + 1) * self.rows]
+            yield (namespace, band, chunk.tobytes())
+
+    def lookup(self, text, namespace=None):
+        """
+        Returns:
+            (value, similarity) for the most similar stored document above the
+            threshold, or (None, best_similarity)
+        """
+        sig = self.signature(text)
+        if sig is None:
+            return None, 0.0
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(namespace, sig):
+                candidates |= self._buckets.get(key, set())
+            best_id, best_sim = None, 0.0
+            for entry_id in candidates:
+                _, other, _ = self._entries[entry_id]
+                sim = float(np.mean(sig == other))
+                if sim > best_sim:
+                    best_id, best_sim = entry_id, sim
+            if best_id is not None and best_sim >= self.threshold:
+                self._entries.move_to_end(best_id)
+                self.hits += 1
+                return self._entries[best_id][2], best_sim
+            self.misses += 1
+            return None, best_sim
+
+    def add(self, text, value, namespace=None):
+        """Index text -> value (no-op for texts too short to fingerprint)"""
+        sig = self.signature(text)
+        if sig is None:
+            return
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (namespace, sig, value)
+            for key in self._band_keys(namespace, sig):
+                self._buckets.setdefault(key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._evict_oldest()
+
+    def _evict_oldest(self):
+        entry_id, (namespace, sig, _) = self._entries.popitem(last=False)
+        for key in self._band_keys(namespace, sig):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+                'threshold': self.threshold,
+            }
+
+
+def create_index_from_env():
+    """
+    Build the near-duplicate index from environment variables
+
+    SEMANTIC_CACHE_THRESHOLD: minimum estimated similarity to reuse a summary (default 0.85)
+    SEMANTIC_CACHE_MAX_ENTRIES: documents remembered (default 500)
+    """
+    return NearDuplicateIndex(
+        threshold=float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.85')),
+        max_entries=int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', '500')),
+    )
@@ -0,0 +1,240 @@
+import os
+import json
+import time
+import bisect
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Seconds; covers cache hits (sub-ms) up to slow long-document completions
+LATENCY_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+TOKEN_BUCKETS = (64, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+
+class Histogram:
+    """Fixed-bucket histogram (constant memory) with Prometheus-style cumulative export"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation (None if empty)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets + (float('inf'),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 4),
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+        }
+
+
+def _label_str(labels):
+    return ','.join(f'{k}="{v}"' for k, v in labels)
+
+
+class Telemetry:
+    """
+    Per-call LLM metrics kept in bounded memory.
+
+    Each call is recorded once with its provider, model, cache outcome,
+    status ('ok', 'error', 'rate_limited', 'circuit_open', ...), token usage,
+    queue wait, network latency, end-to-end duration, retries and the HTTP
+    status codes seen. Aggregates live in fixed-bucket histograms and
+    counters keyed by (provider, model); the last max_recent calls are kept
+    verbatim for the admin panel.
+    """
+
+    def __init__(self, max_recent=200):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=max_recent)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._calls = {}  # (provider, model, cache, status) -> count
+            self._status_codes = {}  # (provider, code) -> count
+            self._retries = {}  # (provider, model) -> count
+            self._tokens = {}  # (provider, model, kind) -> count
+            self._histograms = {}  # (name, provider, model) -> Histogram
+            self._recent.clear()
+            self.started_at = time.time()
+
+    def _histogram(self, name, provider, model, buckets):
+        key = (name, provider, model)
+        if key not in self._histograms:
+            self._histograms[key] = Histogram(buckets)
+        return self._histograms[key]
+
+    def record_call(self, provider, model, cache='miss', status='ok', prompt_tokens=0, completion_tokens=0,
+                    queue_wait=0.0, latency=None, duration=0.0, retries=0, status_codes=(), priority=None):
+        """
+        Record one logical LLM call
+
+        Args:
+            cache: 'hit', 'coalesced' (joined an identical in-flight call) or 'miss'
+            latency: network time of the final attempt (None if nothing was sent)
+            duration: end-to-end time including queueing, retries and backoff
+            priority: Scheduling class the call ran at (kept with recent calls)
+        """
+        with self._lock:
+            key = (provider, model, cache, status)
+            self._calls[key] = self._calls.get(key, 0) + 1
+            for code in status_codes:
+                self._status_codes[(provider, code)] = self._status_codes.get((provider, code), 0) + 1
+            if retries:
+                self._retries[(provider, model)] = self._retries.get((provider, model), 0) + retries
+            for kind, n in (('prompt', prompt_tokens), ('completion', completion_tokens)):
+                if n:
+                    self._tokens[(provider, model, kind)] = self._tokens.get((provider, model, kind), 0) + n
+            self._histogram('duration_seconds', provider, model, LATENCY_BUCKETS).observe(duration)
+            if cache == 'miss':
+                self._histogram('queue_wait_seconds', provider, model, LATENCY_BUCKETS).observe(queue_wait)
+                if latency is not None:
+                    self._histogram('latency_seconds', provider, model, LATENCY_BUCKETS).observe(latency)
+                if completion_tokens:
+                    self._histogram('completion_tokens', provider, model, TOKEN_BUCKETS).observe(completion_tokens)
+            self._recent.append({
+                'ts': time.time(), 'provider': provider, 'model': model, 'cache': cache, 'status': status,
+                'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                'queue_wait': round(queue_wait, 3), 'latency': None if latency is None else round(latency, 3),
+                'duration': round(duration, 3), 'retries': retries, 'status_codes': list(status_codes),
+                'priority': priority,
+            })
+
+    def recent_calls(self, limit=50):
+        with self._lock:
+            return list(self._recent)[-limit:]
+
+    def to_json(self):
+        """Aggregates as a JSON-serialisable dict"""
+        with self._lock:
+            models = {}
+            for (provider, model, cache, status), n in self._calls.items():
+                entry = models.setdefault(f'{provider}/{model}', {'calls': 0, 'by_cache': {}, 'by_status': {},
+                                                                  'retries': 0, 'tokens': {}, 'histograms': {}})
+                entry['calls'] += n
+                entry['by_cache'][cache] = entry['by_cache'].get(cache, 0) + n
+                entry['by_status'][status] = entry['by_status'].get(status, 0) + n
+            for (provider, model), n in self._retries.items():
+                models[f'{provider}/{model}']['retries'] = n
+            for (provider, model, kind), n in self._tokens.items():
+                models[f'{provider}/{model}']['tokens'][kind] = n
+            for (name, provider, model), hist in self._histograms.items():
+                models[f'{provider}/{model}']['histograms'][name] = hist.snapshot()
+            return {
+                'since': self.started_at,
+                'models': models,
+                'status_codes': {f'{provider}:{code}': n for (provider, code), n in self._status_codes.items()},
+            }
+
+    def to_prometheus(self):
+        """Aggregates in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            lines += ['# HELP llm_calls_total LLM calls by cache outcome and status', '# TYPE llm_calls_total counter']
+            for (provider, model, cache, status), n in sorted(self._calls.items()):
+                labels = _label_str((('provider', provider), ('model', model), ('cache', cache), ('status', status)))
+                lines.append(f'llm_calls_total{{{labels}}} {n}')
+            lines += ['# HELP llm_http_responses_total HTTP status codes returned by LLM APIs',
+                      '# TYPE llm_http_responses_total counter']
+            # codes mix ints and labels such as 'timeout'
+            for (provider, code), n in sorted(self._status_codes.items(), key=lambda item: str(item[0])):
+                lines.append(f'llm_http_responses_total{{provider="{provider}",code="{code}"}} {n}')
+            lines += ['# HELP llm_retries_total Retried attempts', '# TYPE llm_retries_total counter']
+            for (provider, model), n in sorted(self._retries.items()):
+                lines.append(f'llm_retries_total{{provider="{provider}",model="{model}"}} {n}')
+            lines += ['# HELP llm_tokens_total Prompt and completion tokens', '# TYPE llm_tokens_total counter']
+            for (provider, model, kind), n in sorted(self._tokens.items()):
+                lines.append(f'llm_tokens_total{{provider="{provider}",model="{model}",kind="{kind}"}} {n}')
+            by_name = {}
+            for (name, provider, model), hist in sorted(self._histograms.items()):
+                by_name.setdefault(name, []).append((provider, model, hist))
+            for name, series in by_name.items():
+                metric = f'llm_{name}'
+                lines += [f'# HELP {metric} LLM call {name.replace("_", " ")}', f'# TYPE {metric} histogram']
+                for provider, model, hist in series:
+                    base = f'provider="{provider}",model="{model}"'
+                    cumulative = 0
+                    for bound, n in zip(hist.buckets, hist.counts):
+                        cumulative += n
+                        lines.append(f'{metric}_bucket{{{base},le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_bucket{{{base},le="+Inf"}} {hist.count}')
+                    lines.append(f'{metric}_sum{{{base}}} {hist.sum:.6f}')
+                    lines.append(f'{metric}_count{{{base}}} {hist.count}')
+        return '\n'.join(lines) + '\n'
+
+
+_telemetry = Telemetry()
+_server = None
+_server_lock = threading.Lock()
+
+
+def get_telemetry():
+    """Process-wide Telemetry shared by llm_service and the Gemini provider"""
+    return _telemetry
+
+
+def start_metrics_server(port=None, host='127.0.0.1'):
+    """
+    Serve /metrics (Prometheus text) and /metrics.json on a daemon thread
+
+    Args:
+        port: Port to listen on; defaults to LLM_METRICS_PORT. Does nothing if unset.
+
+    Returns:
+        The running server, or None if no port is configured
+    """
+    global _server
+    port = port or int(os.getenv('LLM_METRICS_PORT', '0'))
+    if not port:
+        return None
+    with _server_lock:
+        if _server is not None:
+            return _server
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, content_type = _telemetry.to_prometheus().encode(), 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body, content_type = json.dumps(_telemetry.to_json()).encode(), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        try:
+            _server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            # Another Streamlit session/process already serves this port
+            print(f"Metrics endpoint not started on port {port}: {e}")
+            return None
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+        print(f"📈 LLM metrics at http://{host}:{port}/metrics")
+        return _server
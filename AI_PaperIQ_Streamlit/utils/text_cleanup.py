@@ -0,0 +1,24 @@
+import re
+from collections import Counter
+
+_PAGE_NUMBER_RE = re.compile(r'^\s*(page\s*)?\d+(\s*(of|/)\s*\d+)?\s*$', re.IGNORECASE)
+
+
+def drop_page_furniture(lines, min_repeats=3, max_length=120):
+    """
+    Remove the page furniture PDF extraction leaves in the text
+
+    Drops page-number lines and header/footer lines (shorter than max_length)
+    that repeat at least min_repeats times across the document.
+
+    Args:
+        lines: Lines of extracted text
+        min_repeats: Occurrences after which a short line counts as a header/footer
+        max_length: Longer lines are never treated as headers/footers
+
+    Returns:
+        list[str]: The remaining lines, unchanged and in their original order
+    """
+    counts = Counter(line.strip() for line in lines if line.strip())
+    repeated = {line for line, n in counts.items() if n >= min_repeats and len(line) < max_length}
+    return [line for line in lines if line.strip() not in repeated and not _PAGE_NUMBER_RE.match(line)]
@@ -0,0 +1,6 @@
+CHARS_PER_TOKEN = 4  # Rough average for English text with the Llama/Gemini tokenizers
+
+
+def estimate_tokens(text):
+    """Cheap token estimate used for budgeting (no tokenizer dependency); rounds up"""
+    return -(-len(text or '') // CHARS_PER_TOKEN)